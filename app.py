@@ -42,5 +42,8 @@ Use the menu on the left to navigate:
 - 🚐 **Pickup Lorry**
 - 🚚 **Tipper Truck**
 - 🏗️ **Machinery**
+- 🟢 **Fleet Availability** (everything free right now, by site)
+- 🔎 **Site Search** (what is at or near a site)
+- 📊 **Utilization Report** (busy vs. available time, login required)
 """)
 
@@ -0,0 +1,338 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+
+"""Benchmarks for the database paths behind the fleet pages.
+
+Generates synthetic schedules shaped like data/*_schedule.xlsx at the
+given scales and times load_table, save_table, the Excel upload (a full
+sheet and one with a few corrected rows) and concurrent whereabout
+updates against a throwaway Postgres database.
+
+    python benchmark.py run --url postgresql+psycopg2://localhost/fleet_bench \\
+        --scales 10 100 1000 --users 1 8 32 --out results.json \\
+        --baseline previous.json
+
+    python benchmark.py startup --budget-ms 3000
+
+Today's plan in each fleet table of that database is overwritten with
+synthetic rows (other days are left alone). The queries use
+Postgres-only features (COPY, UPDATE ... RETURNING in CTEs, advisory
+locks, partitions), so SQLite can't stand in for it.
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import db
+
+# Rows in each sample sheet under data/ (scale 1)
+BASE_ROWS = 8
+
+# Pickup slots per vehicle and day, as in data/pickup_schedule.xlsx
+PICKUP_SLOTS = [("06:00", "09:00"), ("10:00", "12:00"), ("13:00", "16:00"), ("17:00", "23:59")]
+
+SITES = ["Dormitory", "Store", "Site A", "Site B", "P201", "P202", "P203", "On road"]
+REMARKS = ["Morning transport", "Standby for site", "", "Delivering material"]
+
+# Rows changed in each re-uploaded sheet of the upload_correction workload
+CORRECTED_ROWS = 5
+
+
+# -------------------------------------------------
+# Synthetic schedules
+# -------------------------------------------------
+def make_schedule(table_name: str, scale: int, rng: random.Random) -> pd.DataFrame:
+    """BASE_ROWS * scale rows with the table's upload columns."""
+    rows = BASE_ROWS * scale
+    stamp = "2026-01-05 07:30"
+
+    def pick(options):
+        return [rng.choice(options) for _ in range(rows)]
+
+    if table_name == "pickup":
+        slot = [i % len(PICKUP_SLOTS) for i in range(rows)]
+        vehicle = [i // len(PICKUP_SLOTS) for i in range(rows)]
+        return pd.DataFrame({
+            "vehicle_id": [f"P{v + 1:05d}" for v in vehicle],
+            "plate_no": [f"SG{5000 + v}B" for v in vehicle],
+            "driver": [f"Driver {v + 1}" for v in vehicle],
+            "time_start": [PICKUP_SLOTS[s][0] for s in slot],
+            "time_end": [PICKUP_SLOTS[s][1] for s in slot],
+            "current_location": pick(SITES),
+            "status": pick(["Available", "Busy"]),
+            "remarks": pick(REMARKS),
+            "last_updated": stamp,
+        })
+    if table_name == "tipper":
+        return pd.DataFrame({
+            "truck_id": [f"T{i + 1:05d}" for i in range(rows)],
+            "plate_no": [f"S{i + 1}" for i in range(rows)],
+            "driver": [f"Driver {i + 1}" for i in range(rows)],
+            "current_location": pick(SITES),
+            "status": pick(["Available", "Busy"]),
+            "remarks": pick(REMARKS),
+            "last_updated": stamp,
+        })
+    return pd.DataFrame({
+        "machine_id": [f"M{i + 1:05d}" for i in range(rows)],
+        "machine_name": pick(["Excavator", "Roller", "Crane", "Loader"]),
+        "operator": [f"Operator {i + 1}" for i in range(rows)],
+        "current_location": pick(SITES),
+        "status": pick(["Available", "Busy"]),
+        "remarks": pick(REMARKS),
+        "last_updated": stamp,
+    })
+
+
+def to_xlsx(df: pd.DataFrame) -> bytes:
+    buf = io.BytesIO()
+    df.drop(columns="last_updated").to_excel(buf, index=False)
+    return buf.getvalue()
+
+
+# -------------------------------------------------
+# Measurement
+# -------------------------------------------------
+def summarize(name, table_name, scale, users, rows, latencies_s, wall_s) -> dict:
+    ms = np.array(latencies_s) * 1000
+    return {
+        "workload": name,
+        "table": table_name,
+        "scale": scale,
+        "users": users,
+        "rows": rows,
+        "ops": len(ms),
+        "ops_per_s": round(len(ms) / wall_s, 2) if wall_s else None,
+        "rows_per_s": round(rows * len(ms) / wall_s, 1) if wall_s and rows else None,
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+    }
+
+
+def repeat(func, times: int):
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(times):
+        t0 = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - t0)
+    return latencies, time.perf_counter() - started
+
+
+def concurrent_updates(table_name: str, ids: list, users: int, per_user: int, seed: int):
+    """users threads each sending per_user single-row whereabout updates."""
+    latencies = []
+    lock = threading.Lock()
+
+    def driver(n):
+        rng = random.Random(seed + n)
+        mine = []
+        for _ in range(per_user):
+            key = rng.choice(ids)
+            t0 = time.perf_counter()
+            db.update_row(table_name, key, {
+                "current_location": rng.choice(SITES),
+                "status": rng.choice(["Available", "Busy"]),
+                "remarks": f"bench {n}",
+            })
+            mine.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(mine)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(driver, range(users)))
+    return latencies, time.perf_counter() - started
+
+
+def run_table(table_name: str, scale: int, args) -> list:
+    rng = random.Random(args.seed)
+    rows = BASE_ROWS * scale
+    results = []
+
+    # Each repeat saves or uploads a freshly drawn plan for the same assets
+    # (new whereabouts), so none of them is a no-op merge
+    plans = iter([make_schedule(table_name, scale, rng) for _ in range(args.repeat)])
+    latencies, wall = repeat(lambda: db.save_table(next(plans), table_name), args.repeat)
+    results.append(summarize("save_table", table_name, scale, 1, rows, latencies, wall))
+
+    def cold_load():
+        db.invalidate_snapshot(table_name)
+        db.load_table(table_name)
+    latencies, wall = repeat(cold_load, args.repeat)
+    results.append(summarize("load_table", table_name, scale, 1, rows, latencies, wall))
+
+    latencies, wall = repeat(lambda: db.load_table(table_name), args.repeat)
+    results.append(summarize("load_table_cached", table_name, scale, 1, rows, latencies, wall))
+
+    uploads = [make_schedule(table_name, scale, rng) for _ in range(args.repeat)]
+    sheets = iter([to_xlsx(plan) for plan in uploads])
+    required = [c for c in db.TABLE_COLUMNS[table_name] if c != "last_updated"]
+    latencies, wall = repeat(
+        lambda: db.import_excel(io.BytesIO(next(sheets)), table_name, required), args.repeat
+    )
+    results.append(summarize("upload", table_name, scale, 1, rows, latencies, wall))
+
+    # Mid-day re-upload with a few corrected rows (a different few each time)
+    df = uploads[-1]
+    corrections = []
+    for n in range(args.repeat):
+        corrected = df.copy()
+        corrected.loc[rng.sample(range(rows), min(CORRECTED_ROWS, rows)), "remarks"] = f"corrected {n}"
+        corrections.append(to_xlsx(corrected))
+    sheets = iter(corrections)
+    latencies, wall = repeat(
+        lambda: db.import_excel(io.BytesIO(next(sheets)), table_name, required), args.repeat
+    )
+    results.append(summarize("upload_correction", table_name, scale, 1, rows, latencies, wall))
+
+    ids = db.load_table(table_name)["id"].tolist()
+    for users in args.users:
+        latencies, wall = concurrent_updates(table_name, ids, users, args.updates, args.seed)
+        results.append(summarize("update_row", table_name, scale, users, 1, latencies, wall))
+    return results
+
+
+# -------------------------------------------------
+# Reporting
+# -------------------------------------------------
+RESULT_KEY = ["workload", "table", "scale", "users"]
+
+
+def compare(results: pd.DataFrame, baseline_path: str) -> pd.DataFrame:
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = pd.DataFrame(json.load(f)["results"])
+    merged = results.merge(baseline, on=RESULT_KEY, how="left", suffixes=("", "_base"))
+    for col in ["p50_ms", "p95_ms", "ops_per_s"]:
+        merged[f"{col}_change_%"] = ((merged[col] / merged[f"{col}_base"] - 1) * 100).round(1)
+    return merged[RESULT_KEY + ["p50_ms", "p50_ms_change_%", "p95_ms",
+                                "p95_ms_change_%", "ops_per_s", "ops_per_s_change_%"]]
+
+
+def cmd_run(args):
+    url = args.url or os.environ.get("BENCH_DB_URL")
+    if not url:
+        sys.exit("benchmark: pass --url (or set BENCH_DB_URL) to a throwaway Postgres database")
+    db.use_database(url)
+    db.ensure_schema()
+
+    results = []
+    for scale in args.scales:
+        for table_name in args.tables:
+            print(f"… {table_name} x{scale}", file=sys.stderr)
+            results.extend(run_table(table_name, scale, args))
+
+    table = pd.DataFrame(results)
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(table.to_string(index=False))
+        if args.baseline:
+            print("\nChange vs baseline (negative latency change = faster):")
+            print(compare(table, args.baseline).to_string(index=False))
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "args": {k: v for k, v in vars(args).items() if k not in ("url", "func")},
+                "results": results,
+            }, f, indent=2)
+
+
+# -------------------------------------------------
+# Cold start (importing what a page script imports)
+# -------------------------------------------------
+STARTUP_PROBE = """
+import sys, time
+started = time.perf_counter()
+import fleet
+print((time.perf_counter() - started) * 1000)
+print(" ".join(sorted(m for m in sys.modules if "." not in m)))
+"""
+
+# Only needed once a schedule is uploaded, so must not load with a page
+LAZY_MODULES = ["openpyxl"]
+
+# Median cold import allowed (ms); tests/test_startup.py enforces it
+STARTUP_BUDGET_MS = float(os.environ.get("STARTUP_BUDGET_MS", 3000))
+
+
+def measure_startup(runs: int):
+    """Cold-import fleet in fresh interpreters; returns (median ms, timings, eager modules)."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    timings = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", STARTUP_PROBE], cwd=here,
+            capture_output=True, text=True, check=True
+        ).stdout.splitlines()
+        timings.append(float(out[0]))
+        loaded = set(out[1].split())
+    eager = [m for m in LAZY_MODULES if m in loaded]
+    return float(np.median(timings)), timings, eager
+
+
+def cmd_startup(args):
+    median, timings, eager = measure_startup(args.runs)
+    print(f"cold import of the page modules: median {median:.0f} ms, "
+          f"min {min(timings):.0f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+
+    failures = []
+    if median > args.budget_ms:
+        failures.append(f"median {median:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+    if eager:
+        failures.append(f"loaded at startup but should be lazy: {', '.join(eager)}")
+    if failures:
+        sys.exit("startup: " + "; ".join(failures))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="time the database paths at several scales")
+    run.add_argument("--url", help="SQLAlchemy URL of a throwaway Postgres database "
+                                   "(default: $BENCH_DB_URL)")
+    run.add_argument("--scales", type=int, nargs="+", default=[10, 100, 1000],
+                     help="multiples of the sample sheets' row count")
+    run.add_argument("--tables", nargs="+", default=list(db.TABLE_COLUMNS),
+                     choices=list(db.TABLE_COLUMNS))
+    run.add_argument("--users", type=int, nargs="+", default=[1, 8, 32],
+                     help="concurrent drivers sending whereabout updates")
+    run.add_argument("--updates", type=int, default=50, help="updates per driver")
+    run.add_argument("--repeat", type=int, default=5, help="runs of each bulk workload")
+    run.add_argument("--seed", type=int, default=1)
+    run.add_argument("--out", help="write results as JSON (usable as a --baseline)")
+    run.add_argument("--baseline", help="JSON from an earlier --out to compare against")
+    run.set_defaults(func=cmd_run)
+
+    startup = commands.add_parser(
+        "startup", help="check the cold-start import time against a budget (exit 1 if over)"
+    )
+    startup.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS,
+                         help="default: $STARTUP_BUDGET_MS or 3000")
+    startup.add_argument("--runs", type=int, default=5)
+    startup.set_defaults(func=cmd_startup)
+
+    args = parser.parse_args(argv)
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,98 +4,1504 @@
 # In[ ]:
 
 
+import csv
+import io
+import itertools
+import os
+import re
+import threading
+import time
+from datetime import datetime, time as dt_time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
 import streamlit as st
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
+
+import perf
+
+# -------------------------------------------------
+# Settings (Streamlit secrets, then environment)
+# -------------------------------------------------
+def get_setting(name: str, default=None):
+    """Value of a Streamlit secret, falling back to an environment variable."""
+    try:
+        if name in st.secrets:
+            return st.secrets[name]
+    except Exception:
+        pass  # no secrets.toml
+    return os.environ.get(name, default)
 
 # -------------------------------------------------
 # Database connection (Supabase)
 # -------------------------------------------------
-DATABASE_URL = st.secrets["SUPABASE_DB_URL"]
+DATABASE_URL = get_setting("SUPABASE_DB_URL")
+
+# Pool sizing (per app process) and timeouts; all overridable via secrets
+POOL_SIZE = int(get_setting("DB_POOL_SIZE", 5))
+MAX_OVERFLOW = int(get_setting("DB_MAX_OVERFLOW", 10))
+POOL_TIMEOUT = float(get_setting("DB_POOL_TIMEOUT", 10))          # wait for a free connection
+POOL_RECYCLE = int(get_setting("DB_POOL_RECYCLE", 300))           # below Supabase's idle cutoff
+POOL_PRE_PING = str(get_setting("DB_POOL_PRE_PING", "false")).lower() == "true"
+CONNECT_TIMEOUT = int(get_setting("DB_CONNECT_TIMEOUT", 5))
+STATEMENT_TIMEOUT_MS = int(get_setting("DB_STATEMENT_TIMEOUT_MS", 15000))
+
+# "transaction" when DATABASE_URL points at PgBouncer / Supavisor in
+# transaction mode: such poolers reject startup options and don't keep
+# session settings, so the statement timeout is set per transaction.
+POOLER_MODE = get_setting("DB_POOLER_MODE", "none")
+
+# -------------------------------------------------
+# Pool metrics
+# -------------------------------------------------
+_pool_counters = {"connects": 0, "checkouts": 0, "invalidated": 0}
+
+
+def _count_connect(dbapi_conn, record):
+    _pool_counters["connects"] += 1
+
+
+def _count_checkout(dbapi_conn, record, proxy):
+    _pool_counters["checkouts"] += 1
+
+
+def _count_invalidate(dbapi_conn, record, exception):
+    _pool_counters["invalidated"] += 1
+
+
+def _set_statement_timeout(conn):
+    conn.exec_driver_sql(f"SET LOCAL statement_timeout = {STATEMENT_TIMEOUT_MS}")
+
+
+def _create_engine(url: str):
+    connect_args = {"connect_timeout": CONNECT_TIMEOUT}
+    if POOLER_MODE != "transaction":
+        connect_args["options"] = f"-c statement_timeout={STATEMENT_TIMEOUT_MS}"
+
+    new_engine = create_engine(
+        url,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+        pool_recycle=POOL_RECYCLE,
+        pool_pre_ping=POOL_PRE_PING,
+        connect_args=connect_args
+    )
+    if POOLER_MODE == "transaction":
+        event.listen(new_engine, "begin", _set_statement_timeout)
+    event.listen(new_engine, "connect", _count_connect)
+    event.listen(new_engine, "checkout", _count_checkout)
+    event.listen(new_engine, "invalidate", _count_invalidate)
+    return new_engine
+
+
+# Created on first use, once per process (pages only import db)
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """The process-wide engine for DATABASE_URL."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                if not DATABASE_URL:
+                    raise RuntimeError("SUPABASE_DB_URL is not configured")
+                _engine = _create_engine(DATABASE_URL)
+    return _engine
+
+
+def __getattr__(name):
+    # db.engine still works for scripts written against the old module
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def pool_status() -> dict:
+    """Current pool usage plus lifetime counters, for sizing the pool."""
+    pool = get_engine().pool
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "pooler_mode": POOLER_MODE,
+        **_pool_counters,
+    }
+
+# Timezone the dashboard works in (TIMESTAMPTZ values are shown in it)
+LOCAL_TZ = get_setting("APP_TIMEZONE", "Asia/Singapore")
+
+# Writable columns per table (id is assigned by the database)
+TABLE_COLUMNS = {
+    "pickup": [
+        "vehicle_id", "plate_no", "driver",
+        "time_start", "time_end",
+        "current_location", "status", "remarks", "last_updated"
+    ],
+    "tipper": [
+        "truck_id", "plate_no", "driver",
+        "current_location", "status", "remarks", "last_updated"
+    ],
+    "machinery": [
+        "machine_id", "machine_name", "operator",
+        "current_location", "status", "remarks", "last_updated"
+    ],
+}
+
+# -------------------------------------------------
+# Schema migrations (applied in order, each exactly once)
+# -------------------------------------------------
+MIGRATIONS = [
+    (1, [
+        # Pick-up Lorry
+        """
+        CREATE TABLE IF NOT EXISTS pickup (
+            id BIGSERIAL PRIMARY KEY,
+            vehicle_id TEXT,
+            plate_no TEXT,
+            driver TEXT,
+            time_start TEXT,
+            time_end TEXT,
+            current_location TEXT,
+            status TEXT,
+            remarks TEXT,
+            last_updated TEXT
+        )
+        """,
+        # Tipper Truck
+        """
+        CREATE TABLE IF NOT EXISTS tipper (
+            id BIGSERIAL PRIMARY KEY,
+            truck_id TEXT,
+            plate_no TEXT,
+            driver TEXT,
+            current_location TEXT,
+            status TEXT,
+            remarks TEXT,
+            last_updated TEXT
+        )
+        """,
+        # Machinery
+        """
+        CREATE TABLE IF NOT EXISTS machinery (
+            id BIGSERIAL PRIMARY KEY,
+            machine_id TEXT,
+            machine_name TEXT,
+            operator TEXT,
+            current_location TEXT,
+            status TEXT,
+            remarks TEXT,
+            last_updated TEXT
+        )
+        """,
+        # Tables created by older versions (to_sql replace) have no key,
+        # and only the columns the seeded sheet happened to have
+        "ALTER TABLE pickup ADD COLUMN IF NOT EXISTS id BIGSERIAL PRIMARY KEY",
+        "ALTER TABLE tipper ADD COLUMN IF NOT EXISTS id BIGSERIAL PRIMARY KEY",
+        "ALTER TABLE machinery ADD COLUMN IF NOT EXISTS id BIGSERIAL PRIMARY KEY",
+        *[f"ALTER TABLE {table_name} " + ", ".join(
+            f"ADD COLUMN IF NOT EXISTS {c} TEXT" for c in columns
+        ) for table_name, columns in TABLE_COLUMNS.items()],
+    ]),
+    (2, [
+        # Typed time columns; unparseable legacy text becomes NULL. Tables
+        # seeded with to_sql may already hold TIME / TIMESTAMP / numbers
+        # here, so match and cast through text.
+        """
+        ALTER TABLE pickup
+            ALTER COLUMN time_start TYPE TIME USING (
+                CASE WHEN time_start::text ~ '^[0-9]{1,2}:[0-9]{2}' THEN time_start::text::time END),
+            ALTER COLUMN time_end TYPE TIME USING (
+                CASE WHEN time_end::text ~ '^[0-9]{1,2}:[0-9]{2}' THEN time_end::text::time END)
+        """,
+        # last_updated was written as local "YYYY-MM-DD HH:MM" text
+        *[f"""
+        ALTER TABLE {table_name}
+            ALTER COLUMN last_updated TYPE TIMESTAMPTZ USING (
+                CASE WHEN last_updated::text ~ '^[0-9]{{4}}-[0-9]{{2}}-[0-9]{{2}}'
+                THEN last_updated::text::timestamp AT TIME ZONE '{LOCAL_TZ}' END)
+        """ for table_name in ("pickup", "tipper", "machinery")],
+        "CREATE INDEX IF NOT EXISTS pickup_vehicle_id_idx ON pickup (vehicle_id)",
+        "CREATE INDEX IF NOT EXISTS pickup_status_idx ON pickup (status)",
+        "CREATE INDEX IF NOT EXISTS pickup_time_window_idx ON pickup (time_start, time_end)",
+        "CREATE INDEX IF NOT EXISTS tipper_truck_id_idx ON tipper (truck_id)",
+        "CREATE INDEX IF NOT EXISTS tipper_status_idx ON tipper (status)",
+        "CREATE INDEX IF NOT EXISTS machinery_machine_id_idx ON machinery (machine_id)",
+        "CREATE INDEX IF NOT EXISTS machinery_status_idx ON machinery (status)",
+    ]),
+    (3, [
+        # Row version for optimistic concurrency (bumped on every update)
+        "ALTER TABLE pickup ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1",
+        "ALTER TABLE tipper ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1",
+        "ALTER TABLE machinery ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1",
+    ]),
+    (4, [
+        # Append-only whereabout history, one partition per local day
+        """
+        CREATE TABLE IF NOT EXISTS movement_events (
+            event_id BIGSERIAL,
+            event_time TIMESTAMPTZ NOT NULL DEFAULT now(),
+            asset_type TEXT NOT NULL,
+            asset_id TEXT,
+            row_id BIGINT,
+            person TEXT,
+            current_location TEXT,
+            status TEXT,
+            remarks TEXT,
+            PRIMARY KEY (event_id, event_time)
+        ) PARTITION BY RANGE (event_time)
+        """,
+        # Catches rows whose day partition does not exist (yet)
+        "CREATE TABLE IF NOT EXISTS movement_events_default PARTITION OF movement_events DEFAULT",
+        """
+        CREATE INDEX IF NOT EXISTS movement_events_asset_idx
+            ON movement_events (asset_type, asset_id, event_time DESC)
+        """,
+    ]),
+    (5, [
+        # Change feed: every write stamps rows with a global sequence number,
+        # every full replace bumps the table's epoch
+        "CREATE SEQUENCE IF NOT EXISTS fleet_change_seq",
+        *[f"""
+        ALTER TABLE {table_name}
+            ADD COLUMN IF NOT EXISTS change_seq BIGINT NOT NULL DEFAULT nextval('fleet_change_seq')
+        """ for table_name in ("pickup", "tipper", "machinery")],
+        "CREATE INDEX IF NOT EXISTS pickup_change_seq_idx ON pickup (change_seq)",
+        "CREATE INDEX IF NOT EXISTS tipper_change_seq_idx ON tipper (change_seq)",
+        "CREATE INDEX IF NOT EXISTS machinery_change_seq_idx ON machinery (change_seq)",
+        """
+        CREATE TABLE IF NOT EXISTS fleet_epoch (
+            table_name TEXT PRIMARY KEY,
+            epoch BIGINT NOT NULL
+        )
+        """,
+    ]),
+    (6, [
+        # All asset types in one shape; filters are pushed into each branch
+        """
+        CREATE OR REPLACE VIEW fleet_status AS
+            SELECT 'pickup' AS asset_type, id, vehicle_id AS asset_id,
+                   plate_no AS detail, driver AS person, current_location, status,
+                   time_start, time_end, remarks, last_updated
+            FROM pickup
+            UNION ALL
+            SELECT 'tipper', id, truck_id, plate_no, driver, current_location, status,
+                   NULL::time, NULL::time, remarks, last_updated
+            FROM tipper
+            UNION ALL
+            SELECT 'machinery', id, machine_id, machine_name, operator, current_location, status,
+                   NULL::time, NULL::time, remarks, last_updated
+            FROM machinery
+        """,
+    ]),
+    (7, [
+        # Idempotency keys of queued writes already applied (write_queue.py)
+        """
+        CREATE TABLE IF NOT EXISTS applied_writes (
+            idempotency_key TEXT PRIMARY KEY,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """,
+    ]),
+    (8, [
+        # Schedules are kept per day; existing rows become today's plan
+        *[f"""
+        ALTER TABLE {table_name}
+            ADD COLUMN IF NOT EXISTS schedule_date DATE NOT NULL
+            DEFAULT (now() AT TIME ZONE '{LOCAL_TZ}')::date
+        """ for table_name in ("pickup", "tipper", "machinery")],
+        "CREATE INDEX IF NOT EXISTS pickup_day_idx ON pickup (schedule_date, vehicle_id, time_start)",
+        "CREATE INDEX IF NOT EXISTS tipper_day_idx ON tipper (schedule_date, truck_id)",
+        "CREATE INDEX IF NOT EXISTS machinery_day_idx ON machinery (schedule_date, machine_id)",
+        """
+        CREATE OR REPLACE VIEW fleet_status AS
+            SELECT 'pickup' AS asset_type, id, vehicle_id AS asset_id,
+                   plate_no AS detail, driver AS person, current_location, status,
+                   time_start, time_end, remarks, last_updated, schedule_date
+            FROM pickup
+            UNION ALL
+            SELECT 'tipper', id, truck_id, plate_no, driver, current_location, status,
+                   NULL::time, NULL::time, remarks, last_updated, schedule_date
+            FROM tipper
+            UNION ALL
+            SELECT 'machinery', id, machine_id, machine_name, operator, current_location, status,
+                   NULL::time, NULL::time, remarks, last_updated, schedule_date
+            FROM machinery
+        """,
+    ]),
+    (9, [
+        # Keyset pagination order of the schedule view (see fetch_page);
+        # they cover the day indexes of version 8
+        """
+        CREATE INDEX IF NOT EXISTS pickup_page_idx
+            ON pickup (schedule_date, vehicle_id, (coalesce(time_start, TIME '24:00')), id)
+        """,
+        "CREATE INDEX IF NOT EXISTS tipper_page_idx ON tipper (schedule_date, truck_id, id)",
+        "CREATE INDEX IF NOT EXISTS machinery_page_idx ON machinery (schedule_date, machine_id, id)",
+        "DROP INDEX IF EXISTS pickup_day_idx",
+        "DROP INDEX IF EXISTS tipper_day_idx",
+        "DROP INDEX IF EXISTS machinery_day_idx",
+    ]),
+    (10, [
+        # Searchable locations: location_key is current_location trimmed,
+        # upper-cased and with single spaces; site_code the first code
+        # like P201 in it. Both are kept up to date by Postgres.
+        *[f"""
+        ALTER TABLE {table_name}
+            ADD COLUMN IF NOT EXISTS location_key TEXT GENERATED ALWAYS AS
+                (upper(btrim(regexp_replace(current_location, '\\s+', ' ', 'g')))) STORED,
+            ADD COLUMN IF NOT EXISTS site_code TEXT GENERATED ALWAYS AS
+                (substring(upper(current_location) FROM '\\m[A-Z]{{1,3}}[0-9]{{2,4}}\\M')) STORED
+        """ for table_name in ("pickup", "tipper", "machinery", "movement_events")],
+        # Prefix search ("P20" -> P201, P202) on today's rows and on history
+        "CREATE INDEX IF NOT EXISTS pickup_location_idx ON pickup (schedule_date, location_key text_pattern_ops)",
+        "CREATE INDEX IF NOT EXISTS tipper_location_idx ON tipper (schedule_date, location_key text_pattern_ops)",
+        "CREATE INDEX IF NOT EXISTS machinery_location_idx ON machinery (schedule_date, location_key text_pattern_ops)",
+        """
+        CREATE INDEX IF NOT EXISTS movement_events_location_idx
+            ON movement_events (location_key text_pattern_ops, event_time DESC)
+        """,
+        # Substring search ("dorm" -> DORMITORY A) needs pg_trgm; without it
+        # the same queries still work, just without an index
+        """
+        DO $$
+        BEGIN
+            CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        EXCEPTION WHEN OTHERS THEN
+            RAISE NOTICE 'pg_trgm not available: %', SQLERRM;
+        END $$
+        """,
+        """
+        DO $$
+        DECLARE
+            t TEXT;
+        BEGIN
+            IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+                FOREACH t IN ARRAY ARRAY['pickup', 'tipper', 'machinery', 'movement_events'] LOOP
+                    EXECUTE format(
+                        'CREATE INDEX IF NOT EXISTS %I ON %I USING gin (location_key gin_trgm_ops)',
+                        t || '_location_trgm_idx', t
+                    );
+                END LOOP;
+            END IF;
+        END $$
+        """,
+        """
+        CREATE OR REPLACE VIEW fleet_status AS
+            SELECT 'pickup' AS asset_type, id, vehicle_id AS asset_id,
+                   plate_no AS detail, driver AS person, current_location, status,
+                   time_start, time_end, remarks, last_updated, schedule_date,
+                   location_key, site_code
+            FROM pickup
+            UNION ALL
+            SELECT 'tipper', id, truck_id, plate_no, driver, current_location, status,
+                   NULL::time, NULL::time, remarks, last_updated, schedule_date,
+                   location_key, site_code
+            FROM tipper
+            UNION ALL
+            SELECT 'machinery', id, machine_id, machine_name, operator, current_location, status,
+                   NULL::time, NULL::time, remarks, last_updated, schedule_date,
+                   location_key, site_code
+            FROM machinery
+        """,
+    ]),
+    (11, [
+        # When each row's current status began (closed into the rollup below
+        # when the status changes)
+        *[f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS status_since TIMESTAMPTZ"
+          for table_name in ("pickup", "tipper", "machinery")],
+        *[f"UPDATE {table_name} SET status_since = coalesce(last_updated, now()) WHERE status_since IS NULL"
+          for table_name in ("pickup", "tipper", "machinery")],
+        *[f"ALTER TABLE {table_name} ALTER COLUMN status_since SET DEFAULT now()"
+          for table_name in ("pickup", "tipper", "machinery")],
+        # Busy / available minutes per asset, driver or operator and local day
+        """
+        CREATE TABLE IF NOT EXISTS utilization_daily (
+            asset_type TEXT NOT NULL,
+            asset_id TEXT NOT NULL,
+            person TEXT NOT NULL DEFAULT '',
+            day DATE NOT NULL,
+            busy_minutes DOUBLE PRECISION NOT NULL DEFAULT 0,
+            available_minutes DOUBLE PRECISION NOT NULL DEFAULT 0,
+            status_changes INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (asset_type, asset_id, person, day)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS utilization_daily_day_idx ON utilization_daily (day)",
+    ]),
+    (12, [
+        # Whereabouts as the last uploaded sheet had them: a re-upload only
+        # overwrites a live value if the sheet's own value changed. Existing
+        # rows start from their current values.
+        *[f"""
+        ALTER TABLE {table_name}
+            ADD COLUMN IF NOT EXISTS sheet_current_location TEXT,
+            ADD COLUMN IF NOT EXISTS sheet_status TEXT,
+            ADD COLUMN IF NOT EXISTS sheet_remarks TEXT
+        """ for table_name in ("pickup", "tipper", "machinery")],
+        *[f"""
+        UPDATE {table_name}
+        SET sheet_current_location = current_location, sheet_status = status,
+            sheet_remarks = remarks
+        """ for table_name in ("pickup", "tipper", "machinery")],
+    ]),
+    (13, [
+        # Unused, and a DISTINCT ON over every partition of the history;
+        # the latest whereabouts are the live tables themselves
+        "DROP VIEW IF EXISTS latest_movement",
+    ]),
+    (14, [
+        # Change feed retired: pages re-read through the snapshot cache
+        *[f"ALTER TABLE {table_name} DROP COLUMN IF EXISTS change_seq"
+          for table_name in ("pickup", "tipper", "machinery")],
+        "DROP SEQUENCE IF EXISTS fleet_change_seq",
+        "DROP TABLE IF EXISTS fleet_epoch",
+    ]),
+]
 
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True
-)
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# Any constant works; it only has to be the same for every app process
+_SCHEMA_LOCK_ID = 727001
+_UPLOAD_LOCK_ID = 727002
+
+_schema_ready = False
+_schema_lock = threading.Lock()
 
 # -------------------------------------------------
 # Initialise tables (safe to run every time)
 # -------------------------------------------------
 def init_db():
-    with engine.begin() as conn:
+    with get_engine().begin() as conn:
+        # Migrations may rewrite whole tables, and other processes wait on
+        # the lock below meanwhile: STATEMENT_TIMEOUT_MS is for page queries
+        conn.execute(text("SET LOCAL statement_timeout = 0"))
+        # Serialise concurrent app processes starting at the same time
+        conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": _SCHEMA_LOCK_ID})
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"
+        ))
+        current = conn.execute(text("SELECT max(version) FROM schema_version")).scalar() or 0
 
-        # Pick-up Lorry
-        conn.execute(text("""
-            CREATE TABLE IF NOT EXISTS pickup (
-                vehicle_id TEXT,
-                plate_no TEXT,
-                driver TEXT,
-                time_start TEXT,
-                time_end TEXT,
-                current_location TEXT,
-                status TEXT,
-                remarks TEXT,
-                last_updated TEXT
-            )
-        """))
+        for version, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            for statement in statements:
+                conn.execute(text(statement))
+            conn.execute(text("INSERT INTO schema_version (version) VALUES (:v)"), {"v": version})
 
-        # Tipper Truck
-        conn.execute(text("""
-            CREATE TABLE IF NOT EXISTS tipper (
-                truck_id TEXT,
-                plate_no TEXT,
-                driver TEXT,
-                current_location TEXT,
-                status TEXT,
-                remarks TEXT,
-                last_updated TEXT
-            )
-        """))
+# -------------------------------------------------
+# One-time schema bootstrap per process
+# -------------------------------------------------
+def ensure_schema():
+    """Run init_db once per process; later calls cost nothing."""
+    global _schema_ready
+    if _schema_ready:
+        return
 
-        # Machinery
-        conn.execute(text("""
-            CREATE TABLE IF NOT EXISTS machinery (
-                machine_id TEXT,
-                machine_name TEXT,
-                operator TEXT,
-                current_location TEXT,
-                status TEXT,
-                remarks TEXT,
-                last_updated TEXT
-            )
-        """))
+    with _schema_lock:
+        if not _schema_ready:
+            init_db()
+            _schema_ready = True
+
+# Asset identifier and driver/operator column per table
+ASSET_ID_COLUMNS = {"pickup": "vehicle_id", "tipper": "truck_id", "machinery": "machine_id"}
+PERSON_COLUMNS = {"pickup": "driver", "tipper": "driver", "machinery": "operator"}
+
+# Each row belongs to one day's plan; pages show LOCAL_TZ's today
+DATE_COLUMN = "schedule_date"
+
+
+def local_today():
+    """Today's date in LOCAL_TZ (the schedule day pages show by default)."""
+    return pd.Timestamp.now(tz=LOCAL_TZ).date()
+
+
+# Tables whose rows are time slots (time_start / time_end)
+TIME_WINDOW_TABLES = {"pickup"}
+
+# -------------------------------------------------
+# Snapshot cache (shared by all sessions of this process)
+# -------------------------------------------------
+# Seconds a table snapshot is served from memory before re-reading.
+# Writes made through this module invalidate it immediately.
+SNAPSHOT_TTL_SECONDS = float(get_setting("SNAPSHOT_TTL_SECONDS", 5))
+
+_snapshots = {}             # (table_name, key) -> (expires_at, DataFrame)
+_snapshot_generation = {}   # table_name -> bumped on every local write
+_snapshot_guard = threading.Lock()
+_snapshot_loads = itertools.count(1)
+# Cache entries spanning every table live under this name
+ALL_TABLES = "fleet"
+
+_snapshot_loaders = {}      # (table_name, key) -> lock held while it loads
+
+
+def _loader_lock(cache_key) -> threading.Lock:
+    with _snapshot_guard:
+        lock = _snapshot_loaders.get(cache_key)
+        if lock is None:
+            lock = _snapshot_loaders[cache_key] = threading.Lock()
+        return lock
+
+
+def _drop_snapshot(cache_key):
+    """Forget a cache entry and its loader lock (caller holds _snapshot_guard)."""
+    _snapshots.pop(cache_key, None)
+    _snapshot_loaders.pop(cache_key, None)
+
+
+def _cached_read(table_name: str, key, loader) -> pd.DataFrame:
+    """Return loader() for (table_name, key), cached for SNAPSHOT_TTL_SECONDS."""
+    cache_key = (table_name, key)
+    entry = _snapshots.get(cache_key)
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1].copy()
+
+    # One session loads a key, the others wait for its result; other keys
+    # (pages, filters, minutes) load independently
+    with _loader_lock(cache_key):
+        entry = _snapshots.get(cache_key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1].copy()
+
+        generation = _snapshot_generation.get(table_name, 0)
+        df = loader()
+        # Identifies this load; derived caches (schedule.slot_index) key on it
+        df.attrs["snapshot"] = (table_name, key, next(_snapshot_loads))
+        with _snapshot_guard:
+            now = time.monotonic()
+            # Drop expired variants (e.g. previous minutes' queries)
+            for expired in [k for k, v in _snapshots.items() if v[0] <= now]:
+                _drop_snapshot(expired)
+            # Don't cache a read that raced with a local write
+            if _snapshot_generation.get(table_name, 0) == generation:
+                _snapshots[cache_key] = (now + SNAPSHOT_TTL_SECONDS, df)
+            else:
+                _snapshot_loaders.pop(cache_key, None)
+    return df.copy()
+
+
+def invalidate_snapshot(table_name: str):
+    with _snapshot_guard:
+        for name in (table_name, ALL_TABLES):
+            _snapshot_generation[name] = _snapshot_generation.get(name, 0) + 1
+            for cache_key in [k for k in _snapshots if k[0] == name]:
+                _drop_snapshot(cache_key)
+
+
+def use_database(url: str):
+    """Point this process at another database (benchmarks, scripts).
+
+    Replaces the engine and forgets per-database state: schema check,
+    event partitions and cached snapshots.
+    """
+    global _engine, DATABASE_URL, _schema_ready, _trigram
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+        DATABASE_URL = url
+        _engine = None
+    _schema_ready = False
+    _trigram = None
+    _event_partitions.clear()
+    with _snapshot_guard:
+        _snapshots.clear()
+        _snapshot_loaders.clear()
+        for name in list(_snapshot_generation):
+            _snapshot_generation[name] += 1
+
+# -------------------------------------------------
+# Query helper
+# -------------------------------------------------
+def _read_frame(sql: str, params: dict = None, con=None) -> pd.DataFrame:
+    df = pd.read_sql(text(sql), con if con is not None else get_engine(), params=params)
+
+    # TIME values come back as datetime.time; pages work with "HH:MM"
+    for col in ("time_start", "time_end"):
+        if col in df.columns:
+            df[col] = df[col].astype("string").str.slice(0, 5)
+
+    # read_sql returns TIMESTAMPTZ in UTC; show local wall-clock time
+    if "last_updated" in df.columns and len(df):
+        df["last_updated"] = (
+            pd.to_datetime(df["last_updated"], utc=True)
+            .dt.tz_convert(LOCAL_TZ)
+            .dt.tz_localize(None)
+            .dt.floor("s")
+        )
+    return df
 
 # -------------------------------------------------
 # Load table
 # -------------------------------------------------
-def load_table(table_name: str) -> pd.DataFrame:
-    init_db()
-    return pd.read_sql(f"SELECT * FROM {table_name}", engine)
+@perf.instrument("db.load_table")
+def load_table(table_name: str, schedule_date=None) -> pd.DataFrame:
+    """One day's rows of table_name (default: today), ordered by id."""
+    ensure_schema()
+    day = schedule_date or local_today()
+
+    @perf.instrument("db.load_table.query")
+    def load():
+        return _read_frame(
+            f"SELECT * FROM {table_name} WHERE schedule_date = :day ORDER BY id",
+            {"day": day}
+        )
+
+    # Keys end up in df.attrs, which Streamlit serialises as JSON
+    return _cached_read(table_name, ("day", day.isoformat()), load)
+
+# -------------------------------------------------
+# Available units (filtered in SQL)
+# -------------------------------------------------
+def query_available(table_name: str, at_time: str, schedule_date=None) -> pd.DataFrame:
+    """Today's rows with status Available (and, for slot tables, a slot
+    covering at_time, given as "HH:MM")."""
+    ensure_schema()
+    day = schedule_date or local_today()
+    sql = f"SELECT * FROM {table_name} WHERE schedule_date = :day AND status = 'Available'"
+    if table_name in TIME_WINDOW_TABLES:
+        sql += " AND time_start <= CAST(:at AS TIME) AND time_end >= CAST(:at AS TIME)"
+
+    sql += " ORDER BY id"
+
+    return _cached_read(
+        table_name, ("available", day.isoformat(), at_time),
+        lambda: _read_frame(sql, {"day": day, "at": at_time})
+    )
+
+def _like_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _like_prefix(value: str) -> str:
+    return _like_escape(value) + "%"
+
+
+def location_key(value: str) -> str:
+    """value normalised like the location_key column (trim, single spaces, upper)."""
+    return " ".join(str(value).split()).upper()
+
+
+def query_available_all(at_time: str, location: str = None, schedule_date=None) -> pd.DataFrame:
+    """Available units of every asset type in one query (fleet_status view).
+
+    location, if given, matches current_location by case-insensitive
+    prefix (on the indexed location_key), so "P20" finds P201 and P202.
+    """
+    ensure_schema()
+    day = schedule_date or local_today()
+    sql = """
+        SELECT * FROM fleet_status
+        WHERE schedule_date = :day
+          AND status = 'Available'
+          AND (asset_type <> ALL(:slot_tables)
+               OR (time_start <= CAST(:at AS TIME) AND time_end >= CAST(:at AS TIME)))
+    """
+    params = {"day": day, "at": at_time, "slot_tables": sorted(TIME_WINDOW_TABLES)}
+    if location:
+        sql += " AND location_key LIKE :loc"
+        params["loc"] = _like_prefix(location_key(location))
+    sql += " ORDER BY asset_type, asset_id, id"
+
+    return _cached_read(
+        ALL_TABLES, ("available", day.isoformat(), at_time, location),
+        lambda: _read_frame(sql, params)
+    )
 
 # -------------------------------------------------
-# Save table (replace)
+# Location search (site codes and free text)
 # -------------------------------------------------
-def save_table(df: pd.DataFrame, table_name: str):
-    df.to_sql(table_name, engine, if_exists="replace", index=False)
+SEARCH_LIMIT = 200
+
+
+def search_location(query: str, schedule_date=None, limit: int = SEARCH_LIMIT) -> pd.DataFrame:
+    """Every asset (any status) whose location matches query, for one day.
+
+    Matches the site code exactly, the location by prefix ("P20" finds
+    P201 and P202) or anywhere in it ("dorm"); results are ranked in
+    that order (match_rank 0, 1, 2).
+    """
+    ensure_schema()
+    key = location_key(query)
+    if not key:
+        return pd.DataFrame()
+    day = schedule_date or local_today()
+    sql = """
+        SELECT *, CASE WHEN site_code = :q THEN 0
+                       WHEN location_key LIKE :prefix THEN 1
+                       ELSE 2 END AS match_rank
+        FROM fleet_status
+        WHERE schedule_date = :day AND location_key LIKE :contains
+        ORDER BY match_rank, location_key, asset_type, asset_id, id
+        LIMIT :limit
+    """
+    params = {"day": day, "q": key, "prefix": _like_prefix(key),
+              "contains": "%" + _like_escape(key) + "%", "limit": limit}
+    return _cached_read(
+        ALL_TABLES, ("search", day.isoformat(), key, limit),
+        lambda: _read_frame(sql, params)
+    )
+
+
+_trigram = None   # whether pg_trgm is installed (checked once)
+
+
+def _has_trigram() -> bool:
+    global _trigram
+    if _trigram is None:
+        with get_engine().connect() as conn:
+            _trigram = bool(conn.execute(
+                text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            ).scalar())
+    return _trigram
+
+
+def search_location_history(query: str, since=None, limit: int = SEARCH_LIMIT) -> pd.DataFrame:
+    """Assets that reported a location matching query (movement history).
+
+    One row per asset: its latest matching event since `since` (default:
+    7 days ago), newest first. Matches anywhere in the location when
+    pg_trgm indexes exist, else by prefix only (so it stays indexed).
+    """
+    ensure_schema()
+    key = location_key(query)
+    if not key:
+        return pd.DataFrame()
+    since = since or pd.Timestamp.now(tz=LOCAL_TZ) - pd.Timedelta(days=7)
+    pattern = "%" + _like_escape(key) + "%" if _has_trigram() else _like_prefix(key)
+    df = pd.read_sql(text("""
+        SELECT * FROM (
+            SELECT DISTINCT ON (asset_type, asset_id)
+                   asset_type, asset_id, person, current_location, status,
+                   remarks, event_time
+            FROM movement_events
+            WHERE event_time >= :since AND location_key LIKE :pattern
+            ORDER BY asset_type, asset_id, event_time DESC
+        ) latest
+        ORDER BY event_time DESC
+        LIMIT :limit
+    """), get_engine(), params={"since": since, "pattern": pattern, "limit": limit})
+    if len(df):
+        df["event_time"] = df["event_time"].dt.tz_convert(LOCAL_TZ).dt.tz_localize(None)
+    return df
+
+# -------------------------------------------------
+# Schedule pages (keyset pagination, filtered in SQL)
+# -------------------------------------------------
+PAGE_ROWS = int(get_setting("SCHEDULE_PAGE_ROWS", 50))
+
+
+def _page_order(table_name: str) -> list:
+    """Sort key of the schedule view; ends with id so it is unique.
+
+    Slots without a start time sort last (TIME '24:00' is after every slot).
+    """
+    order = [ASSET_ID_COLUMNS[table_name]]
+    if table_name in TIME_WINDOW_TABLES:
+        order.append("coalesce(time_start, TIME '24:00')")
+    return order + ["id"]
+
+
+def fetch_page(table_name: str, after=None, limit: int = PAGE_ROWS,
+               asset_ids=None, status: str = None, schedule_date=None):
+    """One page of a day's schedule, ordered by asset id (and start time).
+
+    after is the cursor returned with the previous page (None for the
+    first page); asset_ids / status filter in SQL. Returns
+    (page, next_cursor, total): next_cursor is None on the last page and
+    total counts all matching rows.
+    """
+    ensure_schema()
+    day = schedule_date or local_today()
+    id_col = ASSET_ID_COLUMNS[table_name]
+    order = _page_order(table_name)
+
+    where = "schedule_date = :day"
+    params = {"day": day}
+    if asset_ids:
+        where += f" AND {id_col} = ANY(:ids)"
+        params["ids"] = [str(a) for a in asset_ids]
+    if status:
+        where += " AND status = :status"
+        params["status"] = status
+
+    sql = f"SELECT * FROM {table_name} WHERE {where}"
+    if after is not None:
+        keys = [f"CAST(:k{i} AS TIME)" if "time_start" in c else f":k{i}" for i, c in enumerate(order)]
+        sql += f" AND ({', '.join(order)}) > ({', '.join(keys)})"
+        params.update({f"k{i}": value for i, value in enumerate(after)})
+    sql += f" ORDER BY {', '.join(order)} LIMIT :limit"
+
+    def load():
+        with get_engine().connect() as conn:
+            total = conn.execute(text(f"SELECT count(*) FROM {table_name} WHERE {where}"), params).scalar()
+            df = _read_frame(sql, {**params, "limit": limit + 1}, con=conn)  # +1: is there more?
+        next_cursor = None
+        if len(df) > limit:
+            df = df.iloc[:limit]
+            last = df.iloc[-1]
+            next_cursor = [str(last[id_col])]
+            if table_name in TIME_WINDOW_TABLES:
+                next_cursor.append("24:00" if pd.isna(last["time_start"]) else str(last["time_start"]))
+            next_cursor.append(int(last["id"]))
+        df.attrs["page"] = {"next": next_cursor, "total": int(total)}
+        return df
+
+    key = ("page", day.isoformat(), None if after is None else tuple(after), limit,
+           tuple(params.get("ids", ())), status)
+    page = _cached_read(table_name, key, load)
+    return page, page.attrs["page"]["next"], page.attrs["page"]["total"]
+
+
+def asset_ids(table_name: str, schedule_date=None) -> list:
+    """Sorted asset ids in one day's plan (default: today), for filters."""
+    ensure_schema()
+    day = schedule_date or local_today()
+    id_col = ASSET_ID_COLUMNS[table_name]
+    df = _cached_read(table_name, ("asset_ids", day.isoformat()), lambda: _read_frame(
+        f"SELECT DISTINCT {id_col} FROM {table_name} "
+        f"WHERE schedule_date = :day AND {id_col} IS NOT NULL ORDER BY {id_col}",
+        {"day": day}
+    ))
+    return df[id_col].tolist()
+
+# -------------------------------------------------
+# Upload diff (apply only the rows a new sheet changes)
+# -------------------------------------------------
+# A sheet row is the same plan row as a stored one if these match (on the
+# same day); repeated keys pair up in order
+PLAN_KEY_COLUMNS = {
+    "pickup": ["vehicle_id", "time_start"],
+    "tipper": ["truck_id"],
+    "machinery": ["machine_id"],
+}
+
+# Kept from the live row unless the sheet's own value changed (see sheet_*)
+WHEREABOUT_COLUMNS = ["current_location", "status", "remarks"]
+
+
+def _create_staging(conn, table_name: str, columns: list) -> str:
+    """Empty temp table for an upload's rows, dropped at commit."""
+    staging = f"{table_name}_staging"
+    conn.execute(text(
+        f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+        f"SELECT {', '.join(columns)} FROM {table_name} WITH NO DATA"
+    ))
+    # Sheet order, for pairing repeated keys
+    conn.execute(text(f"ALTER TABLE {staging} ADD COLUMN sheet_row BIGINT GENERATED ALWAYS AS IDENTITY"))
+    return staging
+
+
+def _merge_staged(conn, table_name: str, staging: str, columns: list) -> dict:
+    """Make the staged days of table_name match staging, row by row.
+
+    Sheet rows are paired with stored rows by PLAN_KEY_COLUMNS. Unpaired
+    stored rows are deleted, unpaired sheet rows inserted, and paired rows
+    updated only if something differs. Returns counts per outcome.
+    """
+    # One upload per table at a time: two would both insert the same new rows
+    conn.execute(text("SELECT pg_advisory_xact_lock(:id, hashtext(:t))"),
+                 {"id": _UPLOAD_LOCK_ID, "t": table_name})
+
+    # TIME '24:00' stands in for a missing slot start (plain equality, so
+    # the join can hash)
+    keys = [DATE_COLUMN] + [
+        f"coalesce({c}, TIME '24:00')" if c in ("time_start", "time_end") else c
+        for c in PLAN_KEY_COLUMNS[table_name] if c in columns
+    ]
+    key_columns = ", ".join(f"{k} AS k{i}" for i, k in enumerate(keys))
+    conn.execute(text(f"""
+        CREATE TEMP TABLE {table_name}_pairs ON COMMIT DROP AS
+        WITH s AS (
+            SELECT sheet_row, {key_columns},
+                   row_number() OVER (PARTITION BY {', '.join(keys)} ORDER BY sheet_row) AS n
+            FROM {staging}
+        ), t AS (
+            SELECT id, {key_columns},
+                   row_number() OVER (PARTITION BY {', '.join(keys)} ORDER BY id) AS n
+            FROM {table_name}
+            WHERE schedule_date IN (SELECT DISTINCT schedule_date FROM {staging})
+        )
+        SELECT s.sheet_row, t.id
+        FROM s FULL JOIN t
+          ON t.n = s.n AND {' AND '.join(f"t.k{i} = s.k{i}" for i in range(len(keys)))}
+    """))
+    counts = {}
+
+    # Gone from the sheet
+    counts["deleted"] = conn.execute(text(f"""
+        DELETE FROM {table_name}
+        WHERE id IN (SELECT id FROM {table_name}_pairs WHERE sheet_row IS NULL)
+    """)).rowcount
+
+    # Changed in the sheet. A whereabout is taken from the sheet only if it
+    # differs from what the previous upload said; otherwise the driver's
+    # live value stays.
+    live = [c for c in WHEREABOUT_COLUMNS if c in columns]
+    plan = [c for c in columns if c not in live and c not in ("last_updated", DATE_COLUMN)]
+    merged = [f"s.{c}" for c in plan] + [
+        f"CASE WHEN s.{c} IS DISTINCT FROM old.sheet_{c} THEN s.{c} ELSE old.{c} END AS {c}"
+        for c in live
+    ] + [f"s.{c} AS sheet_{c}" for c in live]
+    written = plan + live + [f"sheet_{c}" for c in live]
+    # Whether the sheet moved a whereabout (such rows get a history event)
+    moved = " OR ".join(f"s.{c} IS DISTINCT FROM old.sheet_{c}" for c in live) or "false"
+    if "last_updated" in columns and live:
+        # Stamped only when the sheet moved a whereabout
+        merged.append(f"CASE WHEN {moved} THEN coalesce(s.last_updated, old.last_updated) "
+                      f"ELSE old.last_updated END AS last_updated")
+        written.append("last_updated")
+    sets = [f"{c} = m.{c}" for c in written]
+    if "status" in live:
+        sets.append("status_since = CASE WHEN m.status IS DISTINCT FROM t.status "
+                    "THEN now() ELSE t.status_since END")
+    times = "time_start, time_end" if table_name in TIME_WINDOW_TABLES else "NULL::time, NULL::time"
+    rows = conn.execute(text(f"""
+        WITH old AS (
+            SELECT t.*
+            FROM {table_name} t JOIN {table_name}_pairs p ON p.id = t.id
+            WHERE p.sheet_row IS NOT NULL
+            ORDER BY t.id  -- same lock order as row updates
+            FOR UPDATE OF t
+        ), merged AS (
+            SELECT old.id, old.status AS old_status, old.status_since AS old_since,
+                   {moved} AS moved, {', '.join(merged)}
+            FROM old
+            JOIN {table_name}_pairs p ON p.id = old.id
+            JOIN {staging} s ON s.sheet_row = p.sheet_row
+        ), updated AS (
+            UPDATE {table_name} t
+            SET {', '.join(sets)},
+                version = t.version + 1
+            FROM merged m
+            WHERE t.id = m.id
+              AND ({', '.join(f"t.{c}" for c in written)})
+                  IS DISTINCT FROM ({', '.join(f"m.{c}" for c in written)})
+            RETURNING t.*, m.moved, m.old_status, m.old_since
+        ), event AS (
+            INSERT INTO movement_events
+                (asset_type, asset_id, row_id, person,
+                 current_location, status, remarks)
+            SELECT '{table_name}', {ASSET_ID_COLUMNS[table_name]}, id,
+                   {PERSON_COLUMNS[table_name]}, current_location, status, remarks
+            FROM updated
+            WHERE moved
+        )
+        SELECT {ASSET_ID_COLUMNS[table_name]}, {PERSON_COLUMNS[table_name]},
+               schedule_date, {times}, old_status, old_since, status, status_since
+        FROM updated
+    """)).all()
+    counts["updated"] = len(rows)
+    # Same shape as the rows _apply_changes closes into the rollup
+    status_changes = [r for r in rows if r[5] is not None and r[5] != r[7]]
+    if status_changes:
+        _add_utilization(conn.connection.cursor(), table_name, status_changes)
+
+    # New in the sheet
+    inserted = columns + [f"sheet_{c}" for c in live]
+    counts["inserted"] = conn.execute(text(f"""
+        INSERT INTO {table_name} ({', '.join(inserted)})
+        SELECT {', '.join(f"s.{c}" for c in columns + live)}
+        FROM {staging} s JOIN {table_name}_pairs p ON p.sheet_row = s.sheet_row
+        WHERE p.id IS NULL
+        ORDER BY s.sheet_row
+    """)).rowcount
+
+    counts["unchanged"] = conn.execute(text(
+        f"SELECT count(*) FROM {table_name}_pairs WHERE id IS NOT NULL AND sheet_row IS NOT NULL"
+    )).scalar() - counts["updated"]
+    return counts
+
+# -------------------------------------------------
+# Save table (apply df's plan for its days, keep schema)
+# -------------------------------------------------
+def save_table(df: pd.DataFrame, table_name: str, schedule_date=None) -> dict:
+    """Make the plan for the day(s) in df match df; see _merge_staged.
+
+    Rows go to df's schedule_date column if it has one, else to
+    schedule_date (default: today). Other days are left alone. Returns
+    counts of inserted, updated, deleted and unchanged rows.
+    """
+    ensure_schema()
+    _ensure_event_partition()
+    if DATE_COLUMN not in df.columns:
+        df = df.assign(**{DATE_COLUMN: schedule_date or local_today()})
+    columns = [c for c in TABLE_COLUMNS[table_name] if c in df.columns] + [DATE_COLUMN]
+
+    # Stage + merge in one transaction: readers keep seeing the old rows
+    # until commit, and unchanged rows are not touched.
+    with perf.timed("db.save_table") as span, get_engine().begin() as conn:
+        span["rows"] = len(df)
+        staging = _create_staging(conn, table_name, columns)
+        df[columns].to_sql(staging, conn, if_exists="append", index=False)
+        counts = _merge_staged(conn, table_name, staging, columns)
+    invalidate_snapshot(table_name)
+    return counts
+
+# -------------------------------------------------
+# Row-level updates (single row or batch, by primary key)
+# -------------------------------------------------
+class StaleRowError(Exception):
+    """Rows changed (or disappeared) since the caller read them."""
+
+    def __init__(self, table_name: str, keys: list, current: dict = None):
+        self.table_name = table_name
+        self.keys = list(keys)
+        self.current = current or {}  # id -> latest row values (absent if deleted)
+        super().__init__(f"{table_name} rows {self.keys} were modified by someone else")
+
+
+# Cast for values sent through VALUES lists (everything else is TEXT)
+_SQL_TYPES = {"time_start": "time", "time_end": "time", "last_updated": "timestamptz"}
+
+
+def _check_changes(table_name: str, changes) -> list:
+    changes = [(int(key), fields, expected_version) for key, fields, expected_version in changes]
+    keys = [key for key, _, _ in changes]
+    if len(set(keys)) != len(keys):
+        raise ValueError("update_rows: each key may only appear once")
+    for _, fields, _ in changes:
+        unknown = [c for c in fields if c not in TABLE_COLUMNS[table_name]]
+        if unknown:
+            raise ValueError(f"Unknown columns for {table_name}: {unknown}")
+    return changes
+
+
+def _apply_changes(conn, table_name: str, changes: list) -> dict:
+    """Run checked changes on conn; returns {id: new version} of rows written."""
+    groups = {}
+    for key, fields, expected_version in changes:
+        columns = tuple(sorted(fields))
+        version = None if expected_version is None else int(expected_version)
+        groups.setdefault(columns, []).append(
+            (key, version, *(fields[c] for c in columns))
+        )
+
+    from psycopg2.extras import execute_values
+
+    new_versions = {}
+    status_changes = []
+    cursor = conn.connection.cursor()
+    for columns, rows in groups.items():
+        names = ", ".join(columns)
+        template = "(%s::bigint, %s::integer, " + ", ".join(
+            f"%s::{_SQL_TYPES.get(c, 'text')}" for c in columns
+        ) + ")"
+        sets = ", ".join(f"{c} = data.{c}" for c in columns)
+        if "status" in columns:
+            # Lock and read the status being replaced: its time goes to the rollup
+            old = f"""old AS (
+                SELECT t.id, t.status AS old_status, t.status_since AS old_since
+                FROM {table_name} t JOIN data ON data.id = t.id
+                ORDER BY t.id  -- same lock order in every batch
+                FOR UPDATE OF t
+            ),"""
+            sets += """,
+                    status_since = CASE WHEN data.status IS DISTINCT FROM old.old_status
+                                        THEN now() ELSE t.status_since END"""
+            source, old_columns = "data JOIN old ON old.id = data.id", "old.old_status, old.old_since"
+        else:
+            old, source, old_columns = "", "data", "NULL::text AS old_status, NULL::timestamptz AS old_since"
+        times = "time_start, time_end" if table_name in TIME_WINDOW_TABLES else "NULL::time, NULL::time"
+        # The row updates, their history events and (in Python, below) the
+        # rollup are one transaction
+        sql = f"""
+            WITH data (id, expected_version, {names}) AS (VALUES %s),
+            {old}
+            updated AS (
+                UPDATE {table_name} t
+                SET {sets},
+                    version = t.version + 1
+                FROM {source}
+                WHERE t.id = data.id
+                  AND (data.expected_version IS NULL
+                       OR t.version = data.expected_version)
+                RETURNING t.*, {old_columns}
+            ), event AS (
+                INSERT INTO movement_events
+                    (asset_type, asset_id, row_id, person,
+                     current_location, status, remarks)
+                SELECT '{table_name}', {ASSET_ID_COLUMNS[table_name]}, id,
+                       {PERSON_COLUMNS[table_name]}, current_location, status, remarks
+                FROM updated
+            )
+            SELECT id, version, {ASSET_ID_COLUMNS[table_name]}, {PERSON_COLUMNS[table_name]},
+                   schedule_date, {times}, old_status, old_since, status, status_since
+            FROM updated
+        """
+        for row in execute_values(cursor, sql, rows, template=template,
+                                  page_size=len(rows), fetch=True):
+            new_versions[row[0]] = row[1]
+            if row[7] is not None and row[7] != row[9]:
+                status_changes.append(row[2:])
+
+    if status_changes:
+        _add_utilization(cursor, table_name, status_changes)
+    return new_versions
+
+@perf.instrument("db.update_rows")
+def update_rows(table_name: str, changes) -> dict:
+    """Apply (key, fields, expected_version) changes in one transaction.
+
+    Rows are matched by id and sent with execute_values, one statement per
+    distinct set of fields. A change with expected_version only applies if
+    the row still has that version; if any change is stale, nothing is
+    written and StaleRowError lists the stale keys. Returns {id: new version}.
+    """
+    changes = _check_changes(table_name, changes)
+    if not changes:
+        return {}
+
+    ensure_schema()
+    _ensure_event_partition()
+    try:
+        with get_engine().begin() as conn:
+            new_versions = _apply_changes(conn, table_name, changes)
+
+            stale = [key for key, _, _ in changes if key not in new_versions]
+            if stale:
+                current = conn.execute(
+                    text(f"SELECT * FROM {table_name} WHERE id = ANY(:ids)"), {"ids": stale}
+                ).mappings().all()
+                # Raising inside the transaction rolls the whole batch back
+                raise StaleRowError(table_name, stale, {r["id"]: dict(r) for r in current})
+    finally:
+        invalidate_snapshot(table_name)
+    return new_versions
+
+
+# How long applied idempotency keys are remembered
+APPLIED_WRITES_RETENTION = "7 days"
+
+
+@perf.instrument("db.apply_queued_writes")
+def apply_queued_writes(table_name: str, writes: list) -> dict:
+    """Apply queued (idempotency_key, key, fields, expected_version) writes.
+
+    Writes whose key was applied before are skipped, so replaying a batch
+    is harmless. Stale writes don't block the rest. Returns
+    {idempotency_key: "applied" | "duplicate" | "conflict"}.
+    """
+    if not writes:
+        return {}
+    ensure_schema()
+    _ensure_event_partition()
+
+    outcome = {}
+    try:
+        with get_engine().begin() as conn:
+            fresh = set(conn.execute(text("""
+                INSERT INTO applied_writes (idempotency_key)
+                SELECT unnest(CAST(:keys AS TEXT[]))
+                ON CONFLICT DO NOTHING
+                RETURNING idempotency_key
+            """), {"keys": [w[0] for w in writes]}).scalars())
+
+            # Same row twice (e.g. a double submit): apply in order, in rounds
+            pending = [w for w in writes if w[0] in fresh]
+            while pending:
+                round_, later, seen = [], [], set()
+                for write in pending:
+                    (later if write[1] in seen else round_).append(write)
+                    seen.add(write[1])
+                checked = _check_changes(table_name, [w[1:] for w in round_])
+                applied = _apply_changes(conn, table_name, checked)
+                for write, (key, _, _) in zip(round_, checked):
+                    outcome[write[0]] = "applied" if key in applied else "conflict"
+                pending = later
+            outcome.update({w[0]: "duplicate" for w in writes if w[0] not in fresh})
+
+            conn.execute(text(
+                f"DELETE FROM applied_writes WHERE applied_at < now() - interval '{APPLIED_WRITES_RETENTION}'"
+            ))
+    finally:
+        invalidate_snapshot(table_name)
+    return outcome
+
+
+def update_row(table_name: str, key: int, fields: dict, expected_version: int = None) -> int:
+    """Update `fields` of the row with id == key and return its new version.
+
+    With expected_version the update only applies if nobody changed the row
+    in between; otherwise StaleRowError is raised and nothing is written.
+    """
+    return update_rows(table_name, [(key, fields, expected_version)])[int(key)]
+
+# -------------------------------------------------
+# Utilization rollup (maintained on every status change)
+# -------------------------------------------------
+def _status_pieces(table_name: str, schedule_date, time_start, time_end, since, until):
+    """(local day, minutes) pieces of [since, until).
+
+    A slot row's status only counts inside its slot on its schedule day.
+    """
+    zone = ZoneInfo(LOCAL_TZ)
+    since, until = since.astimezone(zone), until.astimezone(zone)
+    if table_name in TIME_WINDOW_TABLES:
+        if time_start is None or time_end is None:
+            return []
+        since = max(since, datetime.combine(schedule_date, time_start, zone))
+        until = min(until, datetime.combine(schedule_date, time_end, zone))
+
+    pieces = []
+    while since < until:
+        end = min(until, datetime.combine(since.date() + timedelta(days=1), dt_time(), zone))
+        # Subtract in UTC: same-zone aware datetimes subtract as wall-clock time
+        minutes = (end.astimezone(timezone.utc) - since.astimezone(timezone.utc)).total_seconds() / 60
+        pieces.append((since.date(), minutes))
+        since = end
+    return pieces
+
+
+def _add_utilization(cursor, table_name: str, status_changes: list):
+    """Close the replaced statuses into utilization_daily (one upsert)."""
+    from psycopg2.extras import execute_values
+
+    totals = {}
+    for asset_id, person, day, start, end, old_status, since, _, now in status_changes:
+        person = person or ""
+        changed = totals.setdefault(
+            (asset_id, person, now.astimezone(ZoneInfo(LOCAL_TZ)).date()), [0.0, 0.0, 0]
+        )
+        changed[2] += 1
+        if old_status not in ("Busy", "Available") or since is None:
+            continue
+        for piece_day, minutes in _status_pieces(table_name, day, start, end, since, now):
+            total = totals.setdefault((asset_id, person, piece_day), [0.0, 0.0, 0])
+            total[0 if old_status == "Busy" else 1] += minutes
+
+    execute_values(cursor, """
+        INSERT INTO utilization_daily AS u
+            (asset_type, asset_id, person, day, busy_minutes, available_minutes, status_changes)
+        VALUES %s
+        ON CONFLICT (asset_type, asset_id, person, day) DO UPDATE
+        SET busy_minutes = u.busy_minutes + excluded.busy_minutes,
+            available_minutes = u.available_minutes + excluded.available_minutes,
+            status_changes = u.status_changes + excluded.status_changes,
+            updated_at = now()
+    """, [(table_name, asset_id, person, day, *total)
+          for (asset_id, person, day), total in totals.items()])
+
+
+def utilization(start, end, asset_type: str = None) -> pd.DataFrame:
+    """Rollup rows for local days start..end (inclusive); reads only the rollup.
+
+    Time in a row's current status is added when that status next changes.
+    """
+    ensure_schema()
+    sql = "SELECT * FROM utilization_daily WHERE day BETWEEN :start AND :end"
+    params = {"start": start, "end": end}
+    if asset_type:
+        sql += " AND asset_type = :t"
+        params["t"] = asset_type
+    sql += " ORDER BY day, asset_type, asset_id, person"
+    return _cached_read(
+        ALL_TABLES, ("utilization", str(start), str(end), asset_type),
+        lambda: pd.read_sql(text(sql), get_engine(), params=params)
+    )
+
+# -------------------------------------------------
+# Movement history
+# -------------------------------------------------
+_event_partitions = set()   # local dates whose partition exists
+
+
+def _ensure_event_partition():
+    """Create today's and tomorrow's movement_events partitions (once per day)."""
+    today = pd.Timestamp.now(tz=LOCAL_TZ).normalize()
+    if today.date() in _event_partitions:
+        return
+
+    with get_engine().begin() as conn:
+        # May wait on the schema lock while init_db migrates (see there)
+        conn.execute(text("SET LOCAL statement_timeout = 0"))
+        conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": _SCHEMA_LOCK_ID})
+        for day in (today, today + pd.Timedelta(days=1)):
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS movement_events_{day:%Y%m%d} "
+                "PARTITION OF movement_events "
+                f"FOR VALUES FROM ('{day.isoformat()}') "
+                f"TO ('{(day + pd.Timedelta(days=1)).isoformat()}')"
+            ))
+    _event_partitions.add(today.date())
+
+
+def movement_history(table_name: str, asset_id: str = None, since=None) -> pd.DataFrame:
+    """Whereabout events for a table (optionally one asset / since a time)."""
+    ensure_schema()
+    sql = "SELECT * FROM movement_events WHERE asset_type = :t"
+    params = {"t": table_name}
+    if asset_id is not None:
+        sql += " AND asset_id = :a"
+        params["a"] = asset_id
+    if since is not None:
+        sql += " AND event_time >= :since"
+        params["since"] = since
+    df = pd.read_sql(text(sql + " ORDER BY event_time DESC"), get_engine(), params=params)
+    if len(df):
+        df["event_time"] = df["event_time"].dt.tz_convert(LOCAL_TZ).dt.tz_localize(None)
+    return df
 
 # -------------------------------------------------
 # Connection test
 # -------------------------------------------------
 def test_connection():
-    with engine.connect() as conn:
+    with get_engine().connect() as conn:
         conn.execute(text("SELECT 1"))
 
 
 ######### Below added for login ###########
-        
-def seed_from_excel(uploaded_file, table_name: str):
-    
-    df = pd.read_excel(uploaded_file)
-
-    df.to_sql(
-        table_name,
-        engine,
-        if_exists="replace",
-        index=False
-    )
 
+# -------------------------------------------------
+# Streaming Excel import (COPY into staging, then diff)
+# -------------------------------------------------
+IMPORT_CHUNK_ROWS = 5000
+
+_HHMM = re.compile(r"^[0-9]{1,2}:[0-9]{2}")
+_ISO_DATE = re.compile(r"^[0-9]{4}-[0-9]{2}-[0-9]{2}$")
+
+
+def _iter_excel_rows(uploaded_file):
+    """Yield the header, then each non-empty data row, of the first sheet."""
+    from openpyxl import load_workbook  # heavy; only needed for uploads
+
+    wb = load_workbook(uploaded_file, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        yield [str(c).strip() if c is not None else "" for c in next(rows, ())]
+        for row in rows:
+            if any(v is not None and v != "" for v in row):
+                yield row
+    finally:
+        wb.close()
+
+
+def _cell_text(value, is_time: bool):
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    if is_time:
+        if isinstance(value, (datetime, dt_time)):
+            return value.strftime("%H:%M")
+        value = str(value).strip()[:5]
+        return value or None
+    return str(value)
+
+
+def _cell_date(value):
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value).strip()[:10] or None
+
+
+@perf.instrument("db.import_excel")
+def import_excel(uploaded_file, table_name: str, required_cols: list,
+                 last_updated=None, chunk_rows: int = IMPORT_CHUNK_ROWS,
+                 schedule_date=None) -> dict:
+    """Apply an Excel upload as one day's plan in table_name.
+
+    Rows go to schedule_date if given, else to the sheet's schedule_date
+    column (YYYY-MM-DD, may span several days), else to today; other days
+    are left alone. The sheet is read in read-only mode and streamed chunk
+    by chunk through COPY into a temporary staging table, then diffed
+    against the stored plan in the same transaction (_merge_staged): only
+    rows the sheet adds, changes or drops are written, and live
+    whereabouts the sheet did not change are kept. Returns the counts plus
+    "rows" (sheet rows read). Raises ValueError (and changes nothing) if a
+    column is missing or a chunk fails validation.
+    """
+    ensure_schema()
+    _ensure_event_partition()
+    with perf.timed("db.import_excel.open"):
+        rows = _iter_excel_rows(uploaded_file)
+        header = next(rows)
+
+    missing = [c for c in required_cols if c not in header]
+    if missing:
+        raise ValueError(f"Missing columns in Excel: {missing}")
+
+    columns = [c for c in TABLE_COLUMNS[table_name] if c in header]
+    positions = [header.index(c) for c in columns]
+    time_cols = set()
+    if table_name in TIME_WINDOW_TABLES:
+        time_cols = {"time_start", "time_end"} & set(columns)
+    id_col = ASSET_ID_COLUMNS[table_name]
+    sheet_dates = schedule_date is None and DATE_COLUMN in header
+    if sheet_dates:
+        columns.append(DATE_COLUMN)
+        positions.append(header.index(DATE_COLUMN))
+    if last_updated is not None and "last_updated" not in columns:
+        columns.append("last_updated")
+    stamp = last_updated.isoformat() if last_updated is not None else None
+    if not sheet_dates:
+        columns.append(DATE_COLUMN)
+    day = None if sheet_dates else (schedule_date or local_today()).isoformat()
+
+    col_list = ", ".join(columns)
+
+    @perf.instrument("db.import_excel.validate")
+    def to_csv(chunk, first_row):
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for offset, row in enumerate(chunk):
+            record = {
+                c: _cell_text(row[p] if p < len(row) else None, c in time_cols)
+                for c, p in zip(columns, positions)
+            }
+            if not record.get(id_col):
+                raise ValueError(f"Row {first_row + offset}: {id_col} is empty")
+            if sheet_dates:
+                record[DATE_COLUMN] = _cell_date(row[positions[-1]] if positions[-1] < len(row) else None)
+                if not record[DATE_COLUMN] or not _ISO_DATE.match(record[DATE_COLUMN]):
+                    raise ValueError(
+                        f"Row {first_row + offset}: bad {DATE_COLUMN} {record[DATE_COLUMN]!r}"
+                    )
+            else:
+                record[DATE_COLUMN] = day
+            for c in time_cols:
+                if record[c] is not None and not _HHMM.match(record[c]):
+                    raise ValueError(f"Row {first_row + offset}: bad {c} {record[c]!r}")
+            if stamp is not None:
+                record["last_updated"] = stamp
+            writer.writerow(["\\N" if record[c] is None else record[c] for c in columns])
+        buf.seek(0)
+        return buf
+
+    total = 0
+    with get_engine().begin() as conn:
+        staging = _create_staging(conn, table_name, columns)
+        copy_sql = f"COPY {staging} ({col_list}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+        cursor = conn.connection.cursor()
+
+        while True:
+            with perf.timed("db.import_excel.read") as span:
+                chunk = list(itertools.islice(rows, chunk_rows))
+                span["rows"] = len(chunk)
+            if not chunk:
+                break
+            buf = to_csv(chunk, total + 2)  # +2: header, 1-based
+            with perf.timed("db.import_excel.copy") as span:
+                cursor.copy_expert(copy_sql, buf)
+                span["rows"] = len(chunk)
+            total += len(chunk)
+
+        # Readers see the old rows until commit
+        with perf.timed("db.import_excel.merge") as span:
+            counts = _merge_staged(conn, table_name, staging, columns)
+            span["rows"] = counts["inserted"] + counts["updated"] + counts["deleted"]
+    invalidate_snapshot(table_name)
+    return {"rows": total, **counts}
+
+
+@perf.instrument("db.seed_from_excel")
+def seed_from_excel(uploaded_file, table_name: str):
+    import_excel(uploaded_file, table_name, required_cols=[])
@@ -0,0 +1,688 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+import streamlit as st
+
+import db
+import perf
+import schedule
+import write_queue
+
+# -------------------------
+# MODULAR LOGIN SETTINGS
+# -------------------------
+ENABLE_LOGIN = True       # <-- Toggle True/False to enable login
+USERNAME = "admin"        # <-- Set your username
+PASSWORD = "1234"         # <-- Set your password
+
+# Seconds between in-place refreshes of an open page's live sections
+REFRESH_SECONDS = float(db.get_setting("LIVE_REFRESH_SECONDS", 10))
+
+# -------------------------
+# TIME (APP_TIMEZONE setting, see db.LOCAL_TZ)
+# -------------------------
+LOCAL_TZ = ZoneInfo(db.LOCAL_TZ)
+
+# =================================================
+# ASSET TYPES
+# =================================================
+@dataclass(frozen=True)
+class AssetSpec:
+    """Everything a fleet page needs to know about one asset type."""
+    table: str                  # db table name
+    name: str                   # "Pick-up Lorry"
+    icon: str
+    noun: str                   # used in messages: "No {noun} available now."
+    id_col: str                 # vehicle_id / truck_id / machine_id
+    id_label: str               # "Vehicle" -> "Select Vehicle"
+    person_label: str           # "Driver" / "Operator"
+    available_columns: tuple    # columns shown in "Available Now"
+    schedule_columns: tuple     # columns shown in "Today's Schedule"
+
+    @property
+    def title(self) -> str:
+        return f"{self.icon} {self.name} Schedule"
+
+    @property
+    def time_window(self) -> bool:
+        return self.table in db.TIME_WINDOW_TABLES
+
+    @property
+    def required_cols(self) -> list:
+        return [c for c in db.TABLE_COLUMNS[self.table] if c != "last_updated"]
+
+
+PICKUP = AssetSpec(
+    table="pickup",
+    name="Pick-up Lorry",
+    icon="🚚",
+    noun="pick-up lorry",
+    id_col="vehicle_id",
+    id_label="Vehicle",
+    person_label="Driver",
+    available_columns=(
+        "vehicle_id", "plate_no", "driver",
+        "current_location", "time_start", "time_end",
+        "remarks", "last_updated"
+    ),
+    schedule_columns=(
+        "vehicle_id", "plate_no", "driver",
+        "current_location", "status",
+        "time_start", "time_end",
+        "remarks", "last_updated", "active_now"
+    ),
+)
+
+TIPPER = AssetSpec(
+    table="tipper",
+    name="Tipper Truck",
+    icon="🚛",
+    noun="tipper truck",
+    id_col="truck_id",
+    id_label="Truck",
+    person_label="Driver",
+    available_columns=(
+        "truck_id", "plate_no", "driver",
+        "current_location", "status", "remarks", "last_updated"
+    ),
+    schedule_columns=(
+        "truck_id", "plate_no", "driver",
+        "current_location", "status",
+        "remarks", "last_updated", "active_now"
+    ),
+)
+
+MACHINERY = AssetSpec(
+    table="machinery",
+    name="Machinery",
+    icon="🏗️",
+    noun="machinery",
+    id_col="machine_id",
+    id_label="Machine",
+    person_label="Operator",
+    available_columns=(
+        "machine_id", "machine_name", "operator",
+        "current_location", "status", "remarks", "last_updated"
+    ),
+    schedule_columns=(
+        "machine_id", "machine_name", "operator",
+        "current_location", "status", "remarks",
+        "last_updated", "active_now"
+    ),
+)
+
+ASSETS = {spec.table: spec for spec in (PICKUP, TIPPER, MACHINERY)}
+
+# Whereabout fields drivers and dispatchers may change
+EDITABLE_COLUMNS = ["current_location", "status", "remarks"]
+
+# =================================================
+# LOGIN
+# =================================================
+def login_required(purpose: str = "upload schedule"):
+    """Returns True if user successfully logged in"""
+    if not ENABLE_LOGIN:
+        return True
+
+    if "logged_in" not in st.session_state:
+        st.session_state.logged_in = False
+
+    if st.session_state.logged_in:
+        return True
+
+    st.subheader(f"🔐 Login to {purpose}")
+    username_input = st.text_input("Username")
+    password_input = st.text_input("Password", type="password")
+
+    if st.button("Login"):
+        if username_input == USERNAME and password_input == PASSWORD:
+            st.session_state.logged_in = True
+            st.rerun()  # <-- immediately rerun to show upload section
+        else:
+            st.error("❌ Invalid username or password")
+
+    return False
+
+# =================================================
+# 1️⃣ UPLOAD DAILY SCHEDULE (LOGIN REQUIRED)
+# =================================================
+def upload_section(spec: AssetSpec, now_dt: datetime):
+    st.subheader("📤 Upload Schedule (Excel)")
+    schedule_date = st.date_input(
+        "Schedule date",
+        value=now_dt.date(),
+        min_value=now_dt.date() - timedelta(days=1),
+        key=f"{spec.table}_upload_date",
+        help="Only rows that differ from this day's plan are changed; "
+             "live locations and statuses the sheet didn't change are kept."
+    )
+    uploaded_file = st.file_uploader(
+        "Select Excel file",
+        type=["xlsx"],
+        help=f"Columns must include: {', '.join(spec.required_cols)}"
+    )
+
+    # The selected file stays in the widget across reruns; import it once
+    imported_key = f"{spec.table}_imported"
+    upload = None if uploaded_file is None else (uploaded_file.file_id, schedule_date)
+    if upload is None or st.session_state.get(imported_key) == upload:
+        return
+
+    try:
+        counts = db.import_excel(uploaded_file, spec.table, spec.required_cols, now_dt,
+                                 schedule_date=schedule_date)
+        st.session_state[imported_key] = upload
+        st.success(
+            f"✅ Schedule for {schedule_date:%d %b %Y} uploaded successfully! "
+            f"{counts['inserted']} added, {counts['updated']} changed, "
+            f"{counts['deleted']} removed, {counts['unchanged']} unchanged."
+        )
+    except ValueError as e:
+        st.error(str(e))
+    except Exception as e:
+        st.error(f"Failed to upload Excel: {e}")
+
+# =================================================
+# 2️⃣ WHEREABOUT UPDATE (NO LOGIN)
+# =================================================
+def _text(value) -> str:
+    return "" if pd.isna(value) else str(value)
+
+
+def _expected_version(spec: AssetSpec, row_id: int, version: int) -> int:
+    """The version a submit for row_id should expect.
+
+    While this session's earlier update of the row is still queued, the
+    page shows the row as it was before that update: the next submit must
+    expect the version the queued one will produce.
+    """
+    chained = st.session_state.setdefault(f"{spec.table}_queued_versions", {})
+    if row_id not in chained:
+        return version
+    key, next_version = chained[row_id]
+    status = write_queue.statuses([key]).get(key, ("done",))[0]
+    if status in ("conflict", "failed") or version >= next_version:
+        del chained[row_id]
+        return version
+    return next_version
+
+
+def update_section(spec: AssetSpec, df, now_dt: datetime):
+    now_str = now_dt.strftime("%H:%M")
+    st.subheader(f"📍 {spec.person_label} Whereabout Update")
+    queued = queued_notices(spec)
+
+    asset = st.selectbox(f"Select {spec.id_label}", df[spec.id_col].unique())
+
+    # Active slot, else the next one (index is built once per loaded table)
+    slots = schedule.slot_index(spec.table, df, spec.id_col)
+    target = df.iloc[slots.target(asset, now_str)]
+
+    # The submit belongs to the row/version shown on the previous run
+    row_id = int(target["id"])
+    shown = (row_id, _expected_version(spec, row_id, int(target["version"])))
+    seen_id, seen_version = st.session_state.get(f"{spec.table}_update_row", shown)
+    st.session_state[f"{spec.table}_update_row"] = shown
+
+    with st.form(f"{spec.table}_update"):
+        location = st.text_input(
+            "Current Location / Site Code",
+            value=_text(target["current_location"]),
+            placeholder="e.g. P201, P202, Dormitory, On road"
+        )
+
+        status = st.selectbox(
+            "Status",
+            ["Available", "Busy"],
+            index=0 if target["status"] == "Available" else 1
+        )
+
+        remarks = st.text_input("Remarks", value=_text(target["remarks"]))
+
+        submit = st.form_submit_button("Update Whereabout")
+
+    if submit:
+        # Saved locally first; the write queue applies it to the database
+        key = write_queue.enqueue(spec.table, seen_id, {
+            "current_location": location,
+            "status": status,
+            "remarks": remarks,
+            "last_updated": now_dt,
+        }, expected_version=seen_version)
+        result = write_queue.wait(key)
+        if result == "conflict":
+            # Rerun to show the row as it is now (the write may have come
+            # from another process, so skip the cached snapshot); the next
+            # submit then carries its current version
+            db.invalidate_snapshot(spec.table)
+            st.session_state.flash_warning = ("⚠️ This record was just updated by someone else. "
+                                              "Please check the latest values and submit again.")
+            st.rerun()
+        if result == "failed":
+            error = write_queue.statuses([key])[key][1]
+            st.error(f"❌ This update could not be saved: {error}")
+            return
+        if result == "pending":
+            queued.append(key)
+            st.session_state[f"{spec.table}_queued_versions"][seen_id] = (key, seen_version + 1)
+            st.session_state.flash = "📥 Whereabout saved — it will sync when the database is reachable."
+        else:
+            st.session_state.flash = "✅ Whereabout updated successfully!"
+        st.rerun()  # show the saved values in the form
+
+
+def queued_notices(spec: AssetSpec) -> list:
+    """Report this session's queued updates; returns the still-pending keys."""
+    queued = st.session_state.setdefault(f"{spec.table}_queued", [])
+    if not queued:
+        return queued
+    outcome = write_queue.statuses(queued)
+    pending = [k for k in queued if outcome.get(k, ("done",))[0] == "pending"]
+    conflicts = sum(1 for k in queued if outcome.get(k, ("done",))[0] == "conflict")
+    failed = [outcome[k][1] for k in queued if outcome.get(k, ("done",))[0] == "failed"]
+    if pending:
+        st.info(f"📥 {len(pending)} update(s) waiting to sync.")
+    if conflicts:
+        st.warning(f"⚠️ {conflicts} queued update(s) were not applied because "
+                   "the record was changed by someone else. Please submit again.")
+    if failed:
+        st.error(f"❌ {len(failed)} queued update(s) could not be saved: {failed[-1]}")
+    queued[:] = pending
+    return queued
+
+# =================================================
+# 3️⃣ AVAILABLE NOW + 4️⃣ TODAY'S SCHEDULE
+# =================================================
+def available_section(spec: AssetSpec, now_str: str):
+    st.subheader("🟢 Available Now")
+
+    available = db.query_available(spec.table, now_str)
+    if available.empty:
+        st.warning(f"No {spec.noun} available now.")
+        return
+    with perf.timed(f"page.{spec.table}.available.render") as span:
+        span["rows"] = len(available)
+        st.dataframe(available[list(spec.available_columns)], use_container_width=True)
+
+
+def schedule_section(spec: AssetSpec, now_str: str):
+    st.subheader(f"📅 Today's {spec.name} Schedule")
+
+    asset_column, status_column = st.columns([3, 1])
+    asset_filter = asset_column.multiselect(
+        f"Filter by {spec.id_label}",
+        db.asset_ids(spec.table),
+        key=f"{spec.table}_asset_filter",
+        placeholder=f"All {spec.id_label.lower()}s"
+    )
+    status_filter = status_column.selectbox(
+        "Status", ["All", "Available", "Busy"], key=f"{spec.table}_status_filter"
+    )
+    status_filter = None if status_filter == "All" else status_filter
+
+    # Multi-row editing is a dispatcher action (same login as upload)
+    can_edit = not ENABLE_LOGIN or st.session_state.get("logged_in", False)
+    if can_edit and st.toggle("✏️ Edit multiple rows", key=f"{spec.table}_edit_mode"):
+        edit_grid(spec, asset_filter)
+        return
+    st.session_state.pop(f"{spec.table}_edit_base", None)
+
+    # Only the visible page is queried (filtered and sorted in SQL)
+    pages = _page_state(spec, (tuple(asset_filter), status_filter))
+    with perf.timed(f"page.{spec.table}.schedule.filter") as span:
+        page, next_cursor, total = db.fetch_page(
+            spec.table, after=pages["cursors"][-1],
+            asset_ids=asset_filter, status=status_filter
+        )
+        span["rows"] = len(page)
+    if page.empty:
+        st.info("No rows match the filter.")
+        return
+
+    page = page.assign(active_now=schedule.active_labels(page, now_str))
+    with perf.timed(f"page.{spec.table}.schedule.render") as span:
+        span["rows"] = len(page)
+        st.dataframe(page[list(spec.schedule_columns)], hide_index=True, use_container_width=True)
+
+    first = (len(pages["cursors"]) - 1) * db.PAGE_ROWS + 1
+    info, back, forward = st.columns([4, 1, 1])
+    info.caption(f"Rows {first}–{first + len(page) - 1} of {total}")
+    back.button("◀ Previous", key=f"{spec.table}_page_back",
+                disabled=len(pages["cursors"]) == 1,
+                on_click=pages["cursors"].pop, use_container_width=True)
+    forward.button("Next ▶", key=f"{spec.table}_page_next",
+                   disabled=next_cursor is None,
+                   on_click=pages["cursors"].append, args=(next_cursor,),
+                   use_container_width=True)
+
+
+def _page_state(spec: AssetSpec, filters) -> dict:
+    """Cursor stack of the schedule pager; back to page 1 when filters change."""
+    state = st.session_state.setdefault(f"{spec.table}_pages", {"filters": None})
+    if state["filters"] != filters:
+        state.update(filters=filters, cursors=[None])
+    return state
+
+
+def _sort_columns(spec: AssetSpec) -> list:
+    return [spec.id_col, "time_start"] if spec.time_window else [spec.id_col]
+
+
+def _changed_keys(base, edited, columns) -> list:
+    before = base[columns].astype("string").fillna("")
+    after = edited[columns].astype("string").fillna("")
+    return list(base.index[(before != after).any(axis=1)])
+
+
+def edit_grid(spec: AssetSpec, asset_filter):
+    """Editable schedule; saves only the changed rows, in one batch."""
+    # Edit a copy frozen when edit mode is turned on, so refreshes don't
+    # reset the editor
+    base_key = f"{spec.table}_edit_base"
+    if base_key not in st.session_state:
+        df = schedule.typed_table(spec.table, db.load_table(spec.table))
+        st.session_state[base_key] = schedule.to_display(
+            df.set_index("id").sort_values(_sort_columns(spec))
+        )
+    base = st.session_state[base_key]
+    if asset_filter:
+        base = base[base[spec.id_col].isin(asset_filter)]
+
+    edited = st.data_editor(
+        base,
+        key=f"{spec.table}_editor",
+        column_order=[c for c in spec.schedule_columns if c != "active_now"],
+        disabled=[c for c in base.columns if c not in EDITABLE_COLUMNS],
+        column_config={
+            "status": st.column_config.SelectboxColumn("status", options=["Available", "Busy"]),
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+
+    changed = _changed_keys(base, edited, EDITABLE_COLUMNS)
+    if not st.button(f"💾 Save {len(changed)} changed row(s)", disabled=not changed):
+        return
+
+    now_dt = datetime.now(LOCAL_TZ)
+    changes = [
+        (key, {
+            **{c: _text(edited.at[key, c]) for c in EDITABLE_COLUMNS},
+            "last_updated": now_dt,
+        }, int(base.at[key, "version"]))
+        for key in changed
+    ]
+    try:
+        db.update_rows(spec.table, changes)
+    except db.StaleRowError as e:
+        st.warning(f"⚠️ {len(e.keys)} row(s) were changed by someone else meanwhile, "
+                   "so nothing was saved. Turn edit mode off and on to reload.")
+        return
+
+    st.session_state.pop(base_key, None)
+    st.session_state.pop(f"{spec.table}_editor", None)
+    st.session_state.flash = f"✅ {len(changes)} row(s) updated successfully!"
+    st.rerun()
+
+
+def live_sections(spec: AssetSpec):
+    """Sections re-queried in place every REFRESH_SECONDS (no full rerun).
+
+    Both read only what they show (query_available / fetch_page, served
+    from the snapshot cache).
+    """
+
+    @st.fragment(run_every=REFRESH_SECONDS)
+    @perf.instrument(f"page.{spec.table}.live")
+    def render():
+        now_str = datetime.now(LOCAL_TZ).strftime("%H:%M")
+        try:
+            available_section(spec, now_str)
+            schedule_section(spec, now_str)
+        except Exception as e:
+            st.error(f"Failed to load data: {e}")
+
+    render()
+
+# =================================================
+# PAGE
+# =================================================
+def render_page(spec: AssetSpec):
+    with perf.timed(f"page.{spec.table}"):
+        _render_page(spec)
+
+
+def _render_page(spec: AssetSpec):
+    st.set_page_config(
+        page_title=spec.title,
+        page_icon=spec.icon,
+        layout="wide"
+    )
+    st.title(spec.title)
+
+    now_dt = datetime.now(LOCAL_TZ)
+    st.caption(f"🕒 Current Time (SG): **{now_dt.strftime('%H:%M')}**")
+
+    if "flash" in st.session_state:
+        st.success(st.session_state.pop("flash"))
+    if "flash_warning" in st.session_state:
+        st.warning(st.session_state.pop("flash_warning"))
+
+    if login_required():
+        upload_section(spec, now_dt)
+
+    # Today's plan from the snapshot cache, typed once per snapshot
+    last_key = f"{spec.table}_last_loaded"
+    try:
+        df = schedule.typed_table(spec.table, db.load_table(spec.table))
+        st.session_state[last_key] = df
+    except Exception as e:
+        if last_key not in st.session_state:
+            st.error(f"Failed to load data: {e}")
+            return
+        # Keep serving this session's last copy so whereabout submits still
+        # reach the write queue while the database is unreachable
+        df = st.session_state[last_key]
+        st.warning("⚠️ Can't reach the database: showing the schedule as last loaded. "
+                   "Whereabout updates are saved and will sync when it is back.")
+
+    if df.empty:
+        st.warning(f"No {spec.noun} schedule found for today. Please upload the schedule first.")
+        return
+
+    update_section(spec, df, now_dt)
+    live_sections(spec)
+
+# =================================================
+# FLEET-WIDE AVAILABILITY (all asset types, one query)
+# =================================================
+def render_availability_page():
+    st.set_page_config(
+        page_title="Fleet Availability",
+        page_icon="🟢",
+        layout="wide"
+    )
+    st.title("🟢 Fleet Availability")
+
+    location = st.text_input(
+        "Site / Location Code",
+        placeholder="e.g. P201, P20, Dormitory (empty = all sites)"
+    ).strip()
+
+    @st.fragment(run_every=REFRESH_SECONDS)
+    def render():
+        now_str = datetime.now(LOCAL_TZ).strftime("%H:%M")
+        st.caption(f"🕒 Current Time (SG): **{now_str}**")
+
+        available = db.query_available_all(now_str, location or None)
+        counts = available["asset_type"].value_counts()
+        for column, spec in zip(st.columns(len(ASSETS)), ASSETS.values()):
+            column.metric(f"{spec.icon} {spec.name}", int(counts.get(spec.table, 0)))
+
+        if available.empty:
+            where = f" at {location}" if location else ""
+            st.warning(f"Nothing is available{where} right now.")
+            return
+
+        st.dataframe(
+            available[
+                ["asset_type", "asset_id", "detail", "person",
+                 "current_location", "time_start", "time_end",
+                 "remarks", "last_updated"]
+            ],
+            use_container_width=True
+        )
+
+    render()
+
+# =================================================
+# SITE SEARCH (what is at / near a site, any status)
+# =================================================
+def render_site_search_page():
+    st.set_page_config(
+        page_title="Site Search",
+        page_icon="🔎",
+        layout="wide"
+    )
+    st.title("🔎 Site Search")
+
+    query = st.text_input(
+        "Site code or location",
+        placeholder="e.g. P201, P20 (nearby sites), Dormitory, On road"
+    ).strip()
+    with_history = st.checkbox("Also show assets seen there in the last 7 days")
+    if not query:
+        st.info("Type a site code or part of a location.")
+        return
+
+    with perf.timed("page.site_search") as span:
+        found = db.search_location(query)
+        span["rows"] = len(found)
+    if found.empty:
+        st.warning(f"Nothing is at {query} today.")
+    else:
+        counts = found["asset_type"].value_counts()
+        for column, spec in zip(st.columns(len(ASSETS)), ASSETS.values()):
+            column.metric(f"{spec.icon} {spec.name}", int(counts.get(spec.table, 0)))
+        st.dataframe(
+            found[["asset_type", "asset_id", "detail", "person", "current_location",
+                   "status", "time_start", "time_end", "remarks", "last_updated"]],
+            hide_index=True,
+            use_container_width=True
+        )
+
+    if with_history:
+        st.subheader("🕘 Recently Seen There")
+        history = db.search_location_history(query)
+        if history.empty:
+            st.info("No movements recorded there in the last 7 days.")
+        else:
+            st.dataframe(history, hide_index=True, use_container_width=True)
+
+# =================================================
+# UTILIZATION REPORT (reads only the daily rollups)
+# =================================================
+def render_utilization_page():
+    st.set_page_config(
+        page_title="Utilization Report",
+        page_icon="📊",
+        layout="wide"
+    )
+    st.title("📊 Utilization Report")
+
+    if not login_required("view reports"):
+        return
+
+    today = datetime.now(LOCAL_TZ).date()
+    period, kind, group = st.columns([2, 1, 1])
+    days = period.date_input("Period", value=(today - timedelta(days=6), today), max_value=today)
+    if not isinstance(days, tuple) or len(days) != 2:
+        st.info("Pick a start and an end date.")
+        return
+    names = {spec.table: f"{spec.icon} {spec.name}" for spec in ASSETS.values()}
+    asset_type = kind.selectbox("Asset type", [None, *names],
+                                format_func=lambda t: "All" if t is None else names[t])
+    by_person = group.radio("Group by", ["Asset", "Driver / Operator"]) != "Asset"
+
+    rollup = db.utilization(days[0], days[1], asset_type)
+    st.caption("Time in an asset's current status is added when the status next changes.")
+    if rollup.empty:
+        st.warning("No status changes recorded in this period.")
+        return
+
+    keys = ["asset_type", "person"] if by_person else ["asset_type", "asset_id", "person"]
+    report = rollup.groupby(keys, as_index=False)[
+        ["busy_minutes", "available_minutes", "status_changes"]
+    ].sum()
+    tracked = report["busy_minutes"] + report["available_minutes"]
+    report = report.assign(
+        busy_hours=(report["busy_minutes"] / 60).round(1),
+        available_hours=(report["available_minutes"] / 60).round(1),
+        utilization=(100 * report["busy_minutes"] / tracked.where(tracked > 0)).round(1),
+    ).sort_values("utilization", ascending=False)
+
+    total_busy = report["busy_minutes"].sum()
+    total = total_busy + report["available_minutes"].sum()
+    left, middle, right = st.columns(3)
+    left.metric("Busy Hours", f"{total_busy / 60:,.1f}")
+    middle.metric("Available Hours", f"{(total - total_busy) / 60:,.1f}")
+    right.metric("Utilization", f"{100 * total_busy / total:.1f}%" if total else "–")
+
+    st.dataframe(
+        report[[*keys, "busy_hours", "available_hours", "utilization", "status_changes"]],
+        column_config={
+            "utilization": st.column_config.ProgressColumn(
+                "utilization", format="%.1f%%", min_value=0, max_value=100
+            ),
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+
+    st.subheader("Busy Hours per Day")
+    daily = rollup.pivot_table(index="day", columns="asset_type",
+                               values="busy_minutes", aggfunc="sum", fill_value=0) / 60
+    st.bar_chart(daily)
+
+# =================================================
+# DIAGNOSTICS (admin only)
+# =================================================
+def render_diagnostics_page():
+    st.set_page_config(
+        page_title="Diagnostics",
+        page_icon="🩺",
+        layout="wide"
+    )
+    st.title("🩺 Diagnostics")
+
+    if not login_required("view diagnostics"):
+        return
+
+    st.caption("Timings are for this server process since it started (or the last reset).")
+
+    pool = db.pool_status()
+    columns = st.columns(len(pool) + 1)
+    for column, (name, value) in zip(columns, pool.items()):
+        column.metric(name.replace("_", " ").title(), value)
+    columns[-1].metric("Queued Writes", write_queue.pending_count())
+
+    timings = perf.summary()
+    if timings.empty:
+        st.info("No timings recorded yet. Open a fleet page first.")
+        return
+    st.dataframe(timings, hide_index=True, use_container_width=True)
+
+    metric = st.selectbox("Latency histogram", timings["metric"])
+    st.bar_chart(perf.histogram(metric), sort=False)
+
+    if st.button("Reset timings"):
+        perf.reset()
+        st.rerun()
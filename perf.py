@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+
+import functools
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pandas as pd
+
+# -------------------------------------------------
+# Hot-path timing (process-wide, shown on the Diagnostics page)
+# -------------------------------------------------
+# Histogram bucket upper bounds in milliseconds (last bucket is open)
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Recent samples kept per metric for percentiles
+WINDOW = 1000
+
+_lock = threading.Lock()
+_metrics = {}
+_log = None
+
+
+class _Metric:
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.recent = deque(maxlen=WINDOW)
+
+
+def _log_file():
+    """Open PERF_LOG_PATH (JSON lines) on first use; None if not set."""
+    global _log
+    if _log is None:
+        import db  # db imports this module
+        path = db.get_setting("PERF_LOG_PATH", "")
+        _log = open(path, "a", buffering=1, encoding="utf-8") if path else False
+    return _log
+
+
+def record(name: str, ms: float, rows: int = None):
+    """Add one timing sample (and optional row count) for metric name."""
+    with _lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = _Metric()
+        metric.count += 1
+        metric.total_ms += ms
+        metric.max_ms = max(metric.max_ms, ms)
+        metric.rows += rows or 0
+        metric.buckets[sum(ms > b for b in BUCKETS_MS)] += 1
+        metric.recent.append(ms)
+
+        log = _log_file()
+        if log:
+            log.write(json.dumps({
+                "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+                "metric": name,
+                "ms": round(ms, 3),
+                "rows": rows,
+            }) + "\n")
+
+
+@contextmanager
+def timed(name: str):
+    """Time the with-block as metric name; set span["rows"] to count rows."""
+    span = {"rows": None}
+    started = time.perf_counter()
+    try:
+        yield span
+    finally:
+        record(name, (time.perf_counter() - started) * 1000, span["rows"])
+
+
+def instrument(name: str):
+    """Decorator form of timed(); counts rows of a returned DataFrame or int
+    (or a returned dict's "rows")."""
+    def wrap(func):
+        @functools.wraps(func)
+        def inner(*args, **kwargs):
+            with timed(name) as span:
+                result = func(*args, **kwargs)
+                if isinstance(result, pd.DataFrame):
+                    span["rows"] = len(result)
+                elif isinstance(result, int):
+                    span["rows"] = result
+                elif isinstance(result, dict):
+                    span["rows"] = result.get("rows")
+                return result
+        return inner
+    return wrap
+
+
+def summary() -> pd.DataFrame:
+    """One row per metric: calls, rows and latency percentiles (ms)."""
+    with _lock:
+        rows = [
+            (name, m.count, m.rows, m.total_ms / m.count, m.max_ms, list(m.recent))
+            for name, m in _metrics.items()
+        ]
+    out = pd.DataFrame([
+        {
+            "metric": name,
+            "calls": count,
+            "rows": total_rows,
+            "mean_ms": mean,
+            "p50_ms": pd.Series(recent).quantile(0.50),
+            "p95_ms": pd.Series(recent).quantile(0.95),
+            "p99_ms": pd.Series(recent).quantile(0.99),
+            "max_ms": max_ms,
+        }
+        for name, count, total_rows, mean, max_ms, recent in rows
+    ], columns=["metric", "calls", "rows", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+    return out.sort_values("metric", ignore_index=True).round(2)
+
+
+def histogram(name: str) -> pd.Series:
+    """Call counts per latency bucket for metric name."""
+    labels = [f"≤{b} ms" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]} ms"]
+    with _lock:
+        metric = _metrics.get(name)
+        counts = list(metric.buckets) if metric else [0] * len(labels)
+    return pd.Series(counts, index=pd.Index(labels, name="latency"), name="calls")
+
+
+def reset():
+    with _lock:
+        _metrics.clear()
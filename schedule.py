@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+
+import numpy as np
+import pandas as pd
+
+# -------------------------------------------------
+# Schedule engine (vectorised time-window checks)
+# -------------------------------------------------
+ACTIVE_LABEL = "✅ Active"
+
+
+def to_minutes(values) -> pd.Series:
+    """Parse "HH:MM" values into minutes since midnight (NaN if unparseable).
+
+    Values that are already minutes (a typed frame's time columns) are
+    passed through as floats.
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype("float64")
+    # A day's schedule has few distinct times: parse those, then broadcast
+    codes, uniques = pd.factorize(values)
+    parts = pd.Series(uniques, dtype="string").str.extract(r"^(\d{1,2}):(\d{2})")
+    parsed = (parts[0].astype(float) * 60 + parts[1].astype(float)).to_numpy()
+    minutes = np.append(parsed, np.nan)[codes]  # code -1 (missing) -> NaN
+    return pd.Series(minutes, index=values.index)
+
+
+def to_hhmm(minutes) -> pd.Series:
+    """Minutes since midnight back to "HH:MM" (missing stays missing)."""
+    minutes = pd.Series(minutes).astype("Int16")
+    text = (minutes // 60).astype("string").str.zfill(2) + ":" + \
+        (minutes % 60).astype("string").str.zfill(2)
+    return text.astype(object).where(minutes.notna(), None)
+
+
+def has_time_window(df: pd.DataFrame) -> bool:
+    return "time_start" in df.columns and "time_end" in df.columns
+
+
+def active_mask(df: pd.DataFrame, now_str: str) -> pd.Series:
+    """True for rows whose [time_start, time_end] covers now_str ("HH:MM").
+
+    Tables without a time window (tipper, machinery) have no active slot.
+    """
+    if not has_time_window(df) or df.empty:
+        return pd.Series(False, index=df.index)
+
+    now = float(to_minutes([now_str]).iloc[0])
+    start = to_minutes(df["time_start"]).to_numpy()
+    end = to_minutes(df["time_end"]).to_numpy()
+    # NaN compares False, so rows with missing times are never active
+    return pd.Series((start <= now) & (now <= end), index=df.index)
+
+
+def active_labels(df: pd.DataFrame, now_str: str) -> np.ndarray:
+    """The "active_now" column: ACTIVE_LABEL for active rows, "" otherwise."""
+    return np.where(active_mask(df, now_str).to_numpy(), ACTIVE_LABEL, "")
+
+
+# -------------------------------------------------
+# Per-asset slot index (active / next slot lookup)
+# -------------------------------------------------
+class SlotIndex:
+    """Each asset's slots sorted by start time, for binary-search lookups.
+
+    Positions returned are row positions in the DataFrame the index was
+    built from (use df.iloc).
+    """
+
+    def __init__(self, df: pd.DataFrame, id_col: str):
+        assets = df[id_col].to_numpy()
+        positions = pd.Series(np.arange(len(df)), index=assets)
+        self._first = positions.groupby(level=0, sort=False).first().to_dict()
+        self._last = positions.groupby(level=0, sort=False).last().to_dict()
+        self._slots = {}
+        self._has_times = has_time_window(df)
+
+        if not self._has_times or df.empty:
+            return
+
+        frame = pd.DataFrame({
+            "asset": assets,
+            "start": to_minutes(df["time_start"]).to_numpy(),
+            "end": to_minutes(df["time_end"]).to_numpy(),
+            "pos": np.arange(len(df)),
+        })
+        frame = frame[frame["start"].notna()].sort_values(["asset", "start", "pos"], kind="stable")
+        for asset, slots in frame.groupby("asset", sort=False):
+            ends = slots["end"].to_numpy()
+            self._slots[asset] = (
+                slots["start"].to_numpy(),
+                ends,
+                np.fmax.accumulate(ends),  # latest end among slots started so far
+                slots["pos"].to_numpy(),
+            )
+
+    def target(self, asset_id, now_str: str) -> int:
+        """Position of the asset's active slot (the first row, if several
+        overlap), else its next slot, else its first slot. Tables without
+        time windows get the asset's latest row."""
+        if asset_id in self._slots:
+            starts, ends, reach, pos = self._slots[asset_id]
+            now = float(to_minutes([now_str]).iloc[0])
+            i = int(np.searchsorted(starts, now, side="right"))  # slots started by now
+
+            # Walk back only while an earlier slot could still be running;
+            # of overlapping active slots the pages show the first row
+            active = None
+            j = i - 1
+            while j >= 0 and reach[j] >= now:
+                if ends[j] >= now and (active is None or pos[j] < active):
+                    active = pos[j]
+                j -= 1
+            if active is not None:
+                return int(active)
+            if i < len(starts):
+                return int(pos[i])
+
+        return self._first[asset_id] if self._has_times else self._last[asset_id]
+
+
+_slot_indexes = {}   # table_name -> (snapshot token, SlotIndex)
+
+
+def slot_index(table_name: str, df: pd.DataFrame, id_col: str) -> SlotIndex:
+    """SlotIndex for df, built once per snapshot loaded by db.load_table."""
+    token = df.attrs.get("snapshot")
+    cached = _slot_indexes.get(table_name)
+    if token is not None and cached is not None and cached[0] == token:
+        return cached[1]
+
+    index = SlotIndex(df, id_col)
+    if token is not None:
+        _slot_indexes[table_name] = (token, index)
+    return index
+
+# -------------------------------------------------
+# Typed frames (categoricals + integer minutes, shared per snapshot)
+# -------------------------------------------------
+# Low-cardinality text columns stored as categoricals
+CATEGORY_COLUMNS = (
+    "vehicle_id", "truck_id", "machine_id", "plate_no", "machine_name",
+    "driver", "operator", "status", "current_location",
+)
+TIME_COLUMNS = ("time_start", "time_end")
+
+
+def typed(df: pd.DataFrame) -> pd.DataFrame:
+    """df with categorical text columns and Int16 minutes for time columns.
+
+    Filters then compare category codes / integers instead of strings.
+    Already typed columns are left alone.
+    """
+    columns = {}
+    for c in CATEGORY_COLUMNS:
+        if c in df.columns and not isinstance(df[c].dtype, pd.CategoricalDtype):
+            columns[c] = df[c].astype("category")
+    for c in TIME_COLUMNS:
+        if c in df.columns and not pd.api.types.is_integer_dtype(df[c]):
+            columns[c] = to_minutes(df[c]).astype("Int16")
+    out = df.assign(**columns) if columns else df.copy()
+    out.attrs = dict(df.attrs)
+    return out
+
+
+def to_display(df: pd.DataFrame) -> pd.DataFrame:
+    """A typed frame as plain text columns (for tables and the editor)."""
+    columns = {c: to_hhmm(df[c]) for c in TIME_COLUMNS
+               if c in df.columns and pd.api.types.is_integer_dtype(df[c])}
+    columns.update({c: df[c].astype(object) for c in df.columns
+                    if isinstance(df[c].dtype, pd.CategoricalDtype)})
+    return df.assign(**columns) if columns else df
+
+
+_typed_frames = {}   # table_name -> (snapshot token, typed DataFrame)
+
+
+def typed_table(table_name: str, df: pd.DataFrame) -> pd.DataFrame:
+    """typed(df), converted once per snapshot loaded by db.load_table.
+
+    The result is shared between sessions: treat it as read-only.
+    """
+    token = df.attrs.get("snapshot")
+    cached = _typed_frames.get(table_name)
+    if token is not None and cached is not None and cached[0] == token:
+        return cached[1]
+
+    frame = typed(df)
+    if token is not None:
+        _typed_frames[table_name] = (token, frame)
+    return frame
@@ -0,0 +1,31 @@
+import os
+import sys
+
+# The app's modules live at the repository root (streamlit runs from there)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy import exc as sa_exc
+
+import db
+import write_queue
+
+
+def _unreachable(*args, **kwargs):
+    raise sa_exc.OperationalError("SELECT 1", {}, Exception("connection refused"))
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    """write_queue on a fresh SQLite file, drained only by the test."""
+    monkeypatch.setattr(write_queue, "QUEUE_PATH", str(tmp_path / "queue.sqlite3"))
+    monkeypatch.setattr(write_queue._local, "conn", None, raising=False)
+    monkeypatch.setattr(write_queue, "_start_drainer", lambda: None)
+    return write_queue
+
+
+@pytest.fixture
+def db_down(monkeypatch):
+    """Every database call the write queue makes fails to connect."""
+    monkeypatch.setattr(db, "test_connection", _unreachable)
+    monkeypatch.setattr(db, "apply_queued_writes", _unreachable)
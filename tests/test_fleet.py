@@ -0,0 +1,43 @@
+import os
+
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+import db
+
+PAGE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                    "pages", "1_Pickup_Lorry.py")
+
+
+def _pickup_plan(*args, **kwargs):
+    df = pd.DataFrame({
+        "id": [1], "version": [1], "vehicle_id": ["V1"], "plate_no": ["XA1"],
+        "driver": ["a"], "current_location": ["Dormitory"], "status": ["Available"],
+        "time_start": ["00:00"], "time_end": ["23:59"], "remarks": [""],
+    })
+    df.attrs["snapshot"] = ("pickup", ("day", "test"), 1)
+    return df
+
+
+def _submit(page, location):
+    [t for t in page.text_input if t.label.startswith("Current Location")][0].set_value(location)
+    [b for b in page.button if b.label == "Update Whereabout"][0].click().run()
+
+
+def test_queued_submits_chain_expected_versions(queue, db_down, monkeypatch):
+    monkeypatch.setattr(db, "load_table", _pickup_plan)
+    for section_query in ("query_available", "asset_ids", "fetch_page"):
+        monkeypatch.setattr(db, section_query, db.test_connection)
+
+    page = AppTest.from_file(PAGE, default_timeout=30).run()
+    _submit(page, "P201")
+    _submit(page, "P202")
+    assert not page.exception
+
+    queued = queue._connect().execute(
+        "SELECT fields, expected_version, status FROM queued_writes ORDER BY queued_at"
+    ).fetchall()
+    # The page still shows version 1, but the second update follows the
+    # first one, which will make the row version 2
+    assert [(version, status) for _, version, status in queued] == [(1, "pending"), (2, "pending")]
+    assert ["P201" in fields for fields, _, _ in queued] == [True, False]
@@ -0,0 +1,67 @@
+import random
+
+import pandas as pd
+
+import schedule
+
+
+def _baseline_target(df, id_col, asset, now_str):
+    """The pages' slot lookup before SlotIndex: filter and sort per rerun."""
+    rows = df[df[id_col] == asset]
+    if "time_start" not in df.columns:
+        return rows.index[-1]
+    active = rows[(rows["time_start"] <= now_str) & (rows["time_end"] >= now_str)]
+    if not active.empty:
+        return active.index[0]
+    upcoming = rows[rows["time_start"] > now_str].sort_values("time_start", kind="stable")
+    return upcoming.index[0] if not upcoming.empty else rows.index[0]
+
+
+def _hhmm(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _random_schedule(rng, rows):
+    starts = [rng.randrange(0, 24 * 60, 15) for _ in range(rows)]
+    return pd.DataFrame({
+        "vehicle_id": [f"V{rng.randrange(6)}" for _ in range(rows)],
+        "time_start": [_hhmm(s) for s in starts],
+        # Overlapping and same-start slots are common in uploaded sheets
+        "time_end": [_hhmm(min(s + rng.randrange(0, 6 * 60, 15), 24 * 60 - 1)) for s in starts],
+    })
+
+
+def test_slot_index_matches_baseline_on_random_schedules():
+    rng = random.Random(20261018)
+    for _ in range(60):
+        df = _random_schedule(rng, rng.randrange(1, 40))
+        index = schedule.SlotIndex(df, "vehicle_id")
+        typed_index = schedule.SlotIndex(schedule.typed(df), "vehicle_id")
+        for _ in range(5):
+            now_str = _hhmm(rng.randrange(24 * 60))
+            for asset in df["vehicle_id"].unique():
+                expected = _baseline_target(df, "vehicle_id", asset, now_str)
+                assert index.target(asset, now_str) == expected, (df, asset, now_str)
+                assert typed_index.target(asset, now_str) == expected, (df, asset, now_str)
+
+
+def test_slot_index_without_time_window_uses_latest_row():
+    rng = random.Random(7)
+    df = pd.DataFrame({"truck_id": [f"T{rng.randrange(4)}" for _ in range(30)]})
+    index = schedule.SlotIndex(df, "truck_id")
+    for asset in df["truck_id"].unique():
+        assert index.target(asset, "12:00") == _baseline_target(df, "truck_id", asset, "12:00")
+
+
+def test_slot_index_built_once_per_snapshot():
+    df = _random_schedule(random.Random(1), 10)
+    df.attrs["snapshot"] = ("pickup", ("day", "2026-10-18"), 1)
+    first = schedule.slot_index("pickup", df, "vehicle_id")
+
+    assert schedule.slot_index("pickup", df.copy(), "vehicle_id") is first
+    # typed_table keeps the token, so pages reuse the index across reruns
+    assert schedule.slot_index("pickup", schedule.typed_table("pickup", df), "vehicle_id") is first
+
+    reloaded = df.copy()
+    reloaded.attrs["snapshot"] = ("pickup", ("day", "2026-10-18"), 2)
+    assert schedule.slot_index("pickup", reloaded, "vehicle_id") is not first
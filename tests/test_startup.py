@@ -0,0 +1,14 @@
+import benchmark
+
+
+def test_cold_start_within_budget():
+    median, timings, _ = benchmark.measure_startup(runs=3)
+    assert median <= benchmark.STARTUP_BUDGET_MS, (
+        f"cold import of fleet took {median:.0f} ms (runs: {[round(t) for t in timings]}), "
+        f"budget is {benchmark.STARTUP_BUDGET_MS:.0f} ms"
+    )
+
+
+def test_upload_only_modules_not_loaded_at_startup():
+    _, _, eager = benchmark.measure_startup(runs=1)
+    assert eager == [], f"imported with the page modules but should be lazy: {eager}"
@@ -0,0 +1,75 @@
+import pytest
+from sqlalchemy import exc as sa_exc
+
+import db
+
+FIELDS = {"current_location": "P201", "status": "Busy", "remarks": ""}
+
+
+def _attempts(queue, key):
+    return queue._connect().execute(
+        "SELECT attempts FROM queued_writes WHERE idempotency_key = ?", (key,)
+    ).fetchone()[0]
+
+
+def test_unreachable_database_keeps_writes_pending(queue, db_down):
+    key = queue.enqueue("pickup", 1, FIELDS, expected_version=1)
+
+    for _ in range(queue.MAX_ATTEMPTS + 2):
+        with pytest.raises(sa_exc.OperationalError):
+            queue.drain_once()
+
+    assert queue.statuses([key])[key][0] == "pending"
+    # Time spent unreachable is what the queue is for: no attempts used up
+    assert _attempts(queue, key) == 0
+
+
+def test_retried_once_the_database_is_back(queue, db_down, monkeypatch):
+    key = queue.enqueue("pickup", 1, FIELDS, expected_version=1)
+    with pytest.raises(sa_exc.OperationalError):
+        queue.drain_once()
+
+    monkeypatch.setattr(db, "test_connection", lambda: None)
+    monkeypatch.setattr(db, "apply_queued_writes",
+                        lambda table_name, writes: {w[0]: "applied" for w in writes})
+    assert queue.drain_once() == 1
+    assert queue.statuses([key])[key][0] == "done"
+
+
+def test_bad_write_does_not_block_the_batch(queue, monkeypatch):
+    poison = queue.enqueue("pickup", 2, FIELDS, expected_version=1)
+    good = [queue.enqueue("pickup", row, FIELDS, expected_version=1) for row in (1, 3)]
+    stale = queue.enqueue("pickup", 4, FIELDS, expected_version=1)
+
+    def apply(table_name, writes):
+        if any(w[1] == 2 for w in writes):
+            raise ValueError("invalid input syntax")
+        return {w[0]: "conflict" if w[1] == 4 else "applied" for w in writes}
+
+    monkeypatch.setattr(db, "test_connection", lambda: None)
+    monkeypatch.setattr(db, "apply_queued_writes", apply)
+    assert queue.drain_once() == 4
+
+    result = queue.statuses([poison, stale, *good])
+    assert result[poison] == ("failed", "invalid input syntax")
+    assert result[stale][0] == "conflict"
+    assert [result[k][0] for k in good] == ["done", "done"]
+
+
+def test_retryable_error_gives_up_after_max_attempts(queue, monkeypatch):
+    key = queue.enqueue("pickup", 1, FIELDS, expected_version=1)
+
+    def timeout(table_name, writes):
+        raise sa_exc.OperationalError("UPDATE", {}, Exception("statement timeout"))
+
+    monkeypatch.setattr(db, "test_connection", lambda: None)
+    monkeypatch.setattr(db, "apply_queued_writes", timeout)
+    for attempt in range(1, queue.MAX_ATTEMPTS + 1):
+        assert queue.drain_once() == 0
+        assert _attempts(queue, key) == attempt
+    assert queue.statuses([key])[key][0] == "pending"
+
+    queue.drain_once()
+    status, error = queue.statuses([key])[key]
+    assert status == "failed"
+    assert "statement timeout" in error
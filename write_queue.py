@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import exc as sa_exc
+
+import db
+
+# -------------------------------------------------
+# Durable write queue (driver updates survive a slow or unreachable DB)
+# -------------------------------------------------
+# Updates are written to a local SQLite file first and applied to Postgres
+# by a background thread. Each carries an idempotency key, so a batch that
+# is retried after a lost commit acknowledgement is not applied twice.
+QUEUE_PATH = db.get_setting("WRITE_QUEUE_PATH", ".write_queue.sqlite3")
+DRAIN_BATCH = int(db.get_setting("WRITE_QUEUE_BATCH", 200))
+
+# Retry delay after a failed drain doubles up to this many seconds
+MAX_BACKOFF_SECONDS = 60
+
+# Finished entries are kept this long so pages can report their outcome
+KEEP_FINISHED_SECONDS = 24 * 3600
+
+# A write that keeps failing with a retryable error (e.g. a statement
+# timeout) is given up after this many tries; time spent with the database
+# unreachable doesn't count, that is what the queue is for
+MAX_ATTEMPTS = 5
+
+_wake = threading.Event()
+_lock = threading.Lock()
+_drainer = None
+_local = threading.local()
+
+
+def _connect() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(QUEUE_PATH, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS queued_writes (
+                idempotency_key TEXT PRIMARY KEY,
+                table_name TEXT NOT NULL,
+                row_key INTEGER NOT NULL,
+                fields TEXT NOT NULL,
+                expected_version INTEGER,
+                queued_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'pending',
+                error TEXT
+            )
+        """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS queued_writes_pending_idx "
+            "ON queued_writes (status, queued_at)"
+        )
+        _local.conn = conn
+    return conn
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot queue value of type {type(value).__name__}")
+
+
+# -------------------------------------------------
+# Producer side
+# -------------------------------------------------
+def enqueue(table_name: str, key: int, fields: dict, expected_version=None) -> str:
+    """Queue a row update and return its idempotency key.
+
+    Returns as soon as the update is on local disk; the background thread
+    applies it to the database.
+    """
+    unknown = [c for c in fields if c not in db.TABLE_COLUMNS[table_name]]
+    if unknown:
+        raise ValueError(f"Unknown columns for {table_name}: {unknown}")
+
+    idempotency_key = uuid.uuid4().hex
+    _connect().execute(
+        "INSERT INTO queued_writes "
+        "(idempotency_key, table_name, row_key, fields, expected_version, queued_at) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            idempotency_key, table_name, int(key),
+            json.dumps(fields, default=_json_default),
+            None if expected_version is None else int(expected_version),
+            time.time(),
+        ),
+    )
+    _start_drainer()
+    _wake.set()
+    return idempotency_key
+
+
+def statuses(keys) -> dict:
+    """{idempotency_key: (status, error)} for the given keys."""
+    keys = list(keys)
+    if not keys:
+        return {}
+    rows = _connect().execute(
+        f"SELECT idempotency_key, status, error FROM queued_writes "
+        f"WHERE idempotency_key IN ({', '.join('?' * len(keys))})",
+        keys,
+    ).fetchall()
+    return {k: (status, error) for k, status, error in rows}
+
+
+def wait(key: str, timeout: float = 0.5) -> str:
+    """Wait up to timeout seconds for key to leave the queue; returns its status."""
+    deadline = time.monotonic() + timeout
+    while True:
+        status = statuses([key]).get(key, ("done", None))[0]
+        if status != "pending" or time.monotonic() >= deadline:
+            return status
+        time.sleep(0.02)
+
+
+def pending_count() -> int:
+    return _connect().execute(
+        "SELECT count(*) FROM queued_writes WHERE status = 'pending'"
+    ).fetchone()[0]
+
+
+# -------------------------------------------------
+# Background drain
+# -------------------------------------------------
+def _reachable() -> bool:
+    try:
+        db.test_connection()
+        return True
+    except Exception:
+        return False
+
+
+def _retryable(exc: Exception) -> bool:
+    """Errors worth another try (timeouts, deadlocks, dropped connections)."""
+    return isinstance(exc, (sa_exc.OperationalError, sa_exc.InterfaceError, sa_exc.TimeoutError))
+
+
+def _apply(table_name: str, writes: list) -> dict:
+    """{key: (status, error)} for writes; a bad write doesn't hold up the rest.
+
+    Raises (leaving every write as it is) if the database is unreachable.
+    A write that fails on its own is "failed", or stays "pending" for
+    another try if the error is retryable.
+    """
+    try:
+        outcome = db.apply_queued_writes(table_name, writes)
+        return {key: ("conflict", "Row was changed by someone else") if result == "conflict"
+                else ("done", None) for key, result in outcome.items()}
+    except Exception as exc:
+        if not _reachable():
+            raise
+        if len(writes) == 1:
+            return {writes[0][0]: ("pending" if _retryable(exc) else "failed", str(exc)[:500])}
+
+    # The database is up but the batch failed: find the bad write(s)
+    results = {}
+    for write in writes:
+        results.update(_apply(table_name, [write]))
+    return results
+
+
+def drain_once() -> int:
+    """Apply one batch of pending writes; returns how many were finished."""
+    conn = _connect()
+    conn.execute(
+        "UPDATE queued_writes SET status = 'failed' WHERE status = 'pending' AND attempts >= ?",
+        (MAX_ATTEMPTS,),
+    )
+    rows = conn.execute(
+        "SELECT idempotency_key, table_name, row_key, fields, expected_version "
+        "FROM queued_writes WHERE status = 'pending' "
+        "ORDER BY queued_at LIMIT ?",
+        (DRAIN_BATCH,),
+    ).fetchall()
+    if not rows:
+        return 0
+
+    by_table = {}
+    for key, table_name, row_key, fields, expected_version in rows:
+        by_table.setdefault(table_name, []).append(
+            (key, row_key, json.loads(fields), expected_version)
+        )
+
+    finished = 0
+    for table_name, writes in by_table.items():
+        try:
+            outcome = _apply(table_name, writes)
+        except Exception as exc:
+            conn.execute(
+                f"UPDATE queued_writes SET error = ? "
+                f"WHERE idempotency_key IN ({', '.join('?' * len(writes))})",
+                [str(exc)[:500], *(w[0] for w in writes)],
+            )
+            raise
+        # Writes still pending here failed on their own: that counts as an attempt
+        conn.executemany(
+            "UPDATE queued_writes SET status = ?, error = ?, "
+            "attempts = attempts + (? = 'pending') WHERE idempotency_key = ?",
+            [(status, error, status, key) for key, (status, error) in outcome.items()],
+        )
+        finished += sum(status != "pending" for status, _ in outcome.values())
+    conn.execute(
+        "DELETE FROM queued_writes WHERE status <> 'pending' AND queued_at < ?",
+        (time.time() - KEEP_FINISHED_SECONDS,),
+    )
+    return finished
+
+
+def _drain_forever():
+    backoff = 1
+    while True:
+        _wake.wait(timeout=MAX_BACKOFF_SECONDS)
+        _wake.clear()
+        try:
+            while drain_once():
+                pass
+            backoff = 1
+        except Exception:
+            # Database unreachable: keep the writes and retry later
+            time.sleep(backoff)
+            backoff = min(backoff * 2, MAX_BACKOFF_SECONDS)
+            _wake.set()
+
+
+def _start_drainer():
+    global _drainer
+    if _drainer is None:
+        with _lock:
+            if _drainer is None:
+                _drainer = threading.Thread(
+                    target=_drain_forever, name="write-queue-drain", daemon=True
+                )
+                _drainer.start()
+                # Writes left over from a previous run
+                _wake.set()